@@ -0,0 +1,529 @@
+# /// script
+# requires-python = ">=3.14"
+# dependencies = [
+#     "httpx>=0.28.1",
+#     "rich>=14.2",
+#     "truststore>=0.10.4",
+# ]
+# ///
+"""Benchmark update_docker_images end to end against a synthetic registry and daemon, fully offline.
+
+A local registry stand-in serves N images (a shared base layer plus per-image layers of a configurable
+size), with optional per-request latency; a fraction of the tags point at a newer manifest than the one
+installed, so those get planned and pulled. The daemon side is either an Engine API stub on a unix socket
+or a fake `docker`/`crane` pair on PATH that answers `images`, `image inspect`, `ps` and `pull` (with the
+per-layer progress docker prints on a tty). Each size is timed through the updater's real `main`, counting
+the pulls the daemon side received, docker processes, Engine API requests and registry requests; `--save` and
+`--baseline` compare runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser, Namespace
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final, Self, cast
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from rich.console import Console
+from rich.table import Table
+
+if TYPE_CHECKING:
+    from types import ModuleType
+
+_CONSOLE: Final[Console] = Console()
+_UPDATER: Final[Path] = Path(__file__).with_name("update_docker_images.py")
+_MANIFEST_TYPE: Final[str] = "application/vnd.oci.image.manifest.v1+json"
+_SHIM: Final[str] = """#!{python}
+import json, os, sys, time
+state = json.loads(open(os.environ["BENCH_STATE"]).read())
+with open(os.environ["BENCH_LOG"], "a") as log:
+    log.write(" ".join([os.path.basename(sys.argv[0]), *sys.argv[1:3]]) + "\\n")
+tool, args = os.path.basename(sys.argv[0]), sys.argv[1:]
+if tool == "crane":
+    print(state["remote"].get(args[-1], ""))
+elif args[0] == "images":
+    for image in state["images"]:
+        print("\\t".join((image["tag"], image["id"], image["digest"], "10MB")))
+elif args[:2] == ["image", "inspect"]:
+    for image in state["images"]:
+        if image["id"] in args:
+            digests = json.dumps([image["tag"].rsplit(":", 1)[0] + "@" + image["digest"]])
+            print("\\t".join((image["id"], digests, "2024-01-01T00:00:00Z", state["platform"])))
+elif args[0] == "pull":
+    for layer, size in state["pulls"].get(args[1], {{}}).items():
+        time.sleep(size / state["bandwidth"])
+        print(f"{{layer[7:19]}}: Downloading [==>   ]  1B/{{size}}B", flush=True)
+    print("Status: Downloaded newer image")
+elif args[:2] == ["system", "prune"]:
+    print("Total reclaimed space: 0B")
+"""
+
+
+def main() -> None:
+    opts = parse_cli()
+    updater = load_updater()
+    # The updater draws live tables on its own console; a benchmark only wants the numbers.
+    updater._CONSOLE.quiet = True  # noqa: SLF001
+    results: list[BenchResult] = []
+    for backend in ("engine", "cli") if opts.backend == "both" else (opts.backend,):
+        for count in opts.images:
+            results.append(run_once(updater, Synthetic.build(count, opts), backend, opts))
+            _CONSOLE.print(f"[bright_black]{backend}, {count} images: {results[-1].wall_time:.2f}s[/]")
+    baseline = load_baseline(opts.baseline) if opts.baseline else {}
+    _CONSOLE.print(render(results, baseline))
+    if opts.save:
+        Path(opts.save).write_text(json.dumps([asdict(result) for result in results], indent=1), encoding="utf-8")
+
+
+class Options(Namespace):
+    images: list[int]
+    layers: int
+    layer_size: int
+    stale: float
+    latency: float
+    bandwidth: int
+    backend: str
+    updater_args: str
+    save: str | None
+    baseline: str | None
+
+
+def parse_cli() -> Options:
+    parser = ArgumentParser(description="Benchmark update_docker_images against a local registry and fake daemon.")
+    parser.add_argument(
+        "--images",
+        type=lambda value: [int(part) for part in value.split(",")],
+        default=[10, 100, 1000],
+        metavar="N[,N...]",
+        help="Image counts to run (default: 10,100,1000)",
+    )
+    parser.add_argument("--layers", type=int, default=3, metavar="N", help="Layers per image, one shared (default: 3)")
+    parser.add_argument(
+        "--layer-size", type=parse_bytes, default=parse_bytes("5MB"), metavar="SIZE", help="Bytes per layer (5MB)"
+    )
+    parser.add_argument(
+        "--stale", type=float, default=0.1, metavar="FRACTION", help="Share of images with a newer tag (0.1)"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, metavar="MS", help="Delay added to every registry request (0)"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=parse_bytes,
+        default=parse_bytes("500MB"),
+        metavar="SIZE",
+        help="Simulated pull speed per second (500MB)",
+    )
+    parser.add_argument("--backend", choices=["engine", "cli", "both"], default="both", help="Daemon side to fake")
+    parser.add_argument(
+        "--updater-args",
+        default="",
+        metavar="ARGS",
+        help="Extra update_docker_images flags, e.g. '--registry-limit 127.0.0.1:PORT=32:500'; "
+        "PORT is replaced by the registry's port",
+    )
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON for a later --baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against results saved by --save")
+    opts = Options()
+    parser.parse_args(namespace=opts)
+    return opts
+
+
+def parse_bytes(text: str) -> int:
+    units = {"kb": 1000, "mb": 1000**2, "gb": 1000**3}
+    lowered = text.strip().lower()
+    for suffix, factor in units.items():
+        if lowered.endswith(suffix):
+            return int(float(lowered.removesuffix(suffix)) * factor)
+    return int(lowered.removesuffix("b"))
+
+
+def load_updater() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("update_docker_images", _UPDATER)
+    if spec is None or spec.loader is None:
+        msg = f"cannot load {_UPDATER}"
+        raise ImportError(msg)
+    module = importlib.util.module_from_spec(spec)
+    # Dataclasses resolve string annotations through sys.modules, so register before executing.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_once(updater: ModuleType, synthetic: Synthetic, backend: str, opts: Options) -> BenchResult:
+    with tempfile.TemporaryDirectory() as temp, Registry(synthetic, opts.latency / 1000) as registry:
+        root = Path(temp)
+        synthetic.host = f"127.0.0.1:{registry.port}"
+        env = {"XDG_CACHE_HOME": str(root / "cache"), "DOCKER_CONFIG": str(root / "docker")}
+        argv = ["update_docker_images", *opts.updater_args.replace("PORT", str(registry.port)).split()]
+        engine: EngineStub | None = None
+        log = root / "processes.log"
+        log.touch()
+        if backend == "engine":
+            engine = EngineStub(root / "docker.sock", synthetic, opts.bandwidth)
+            env["DOCKER_HOST"] = f"unix://{engine.path}"
+        else:
+            env |= install_shims(root, synthetic, opts.bandwidth, log)
+            argv.append("--cli")
+        # The updater reads module-level paths and argv at import and parse time; patch them for this run only.
+        with (
+            mock.patch.dict(os.environ, env),
+            mock.patch.object(sys, "argv", argv),
+            mock.patch.object(updater, "_CACHE_DIR", root / "cache" / "update_docker_images"),
+        ):
+            started = time.perf_counter()
+            try:
+                updater.main()
+            finally:
+                wall_time = time.perf_counter() - started
+                if engine is not None:
+                    engine.close()
+        processes = log.read_text(encoding="utf-8").splitlines()
+        return BenchResult(
+            backend=backend,
+            images=len(synthetic.images),
+            stale=sum(image.stale for image in synthetic.images),
+            # Counted where the pulls arrive, so a planner that skips or repeats one shows here.
+            pulls=engine.pulls if engine else sum(line.startswith("docker pull") for line in processes),
+            wall_time=round(wall_time, 3),
+            docker_processes=sum(line.startswith("docker") for line in processes),
+            crane_processes=sum(line.startswith("crane") for line in processes),
+            engine_requests=engine.requests if engine else 0,
+            registry_requests=registry.requests,
+        )
+
+
+def install_shims(root: Path, synthetic: Synthetic, bandwidth: int, log: Path) -> dict[str, str]:
+    bin_dir = root / "bin"
+    bin_dir.mkdir()
+    state = root / "state.json"
+    state.write_text(json.dumps(synthetic.shim_state(bandwidth)), encoding="utf-8")
+    for tool in ("docker", "crane"):
+        shim = bin_dir / tool
+        shim.write_text(_SHIM.format(python=sys.executable), encoding="utf-8")
+        shim.chmod(0o755)
+    return {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "BENCH_STATE": str(state),
+        "BENCH_LOG": str(log),
+    }
+
+
+def load_baseline(path: str) -> dict[tuple[str, int], BenchResult]:
+    entries = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {(entry["backend"], entry["images"]): BenchResult(**entry) for entry in entries}
+
+
+def render(results: list[BenchResult], baseline: dict[tuple[str, int], BenchResult]) -> Table:
+    table = Table(title="update_docker_images benchmark")
+    table.add_column("Backend")
+    table.add_column("Images", justify="right")
+    table.add_column("Stale", justify="right")
+    table.add_column("Pulled", justify="right")
+    table.add_column("Wall", justify="right")
+    if baseline:
+        table.add_column("vs baseline", justify="right")
+    table.add_column("docker procs", justify="right")
+    table.add_column("crane procs", justify="right")
+    table.add_column("Engine reqs", justify="right")
+    table.add_column("Registry reqs", justify="right")
+    for result in results:
+        delta: list[str] = []
+        if baseline:
+            before = baseline.get((result.backend, result.images))
+            change = (result.wall_time / before.wall_time - 1) * 100 if before and before.wall_time else None
+            style = "green" if change is not None and change < 0 else "red"
+            delta = [f"[{style}]{change:+.0f}%[/]" if change is not None else ""]
+        table.add_row(
+            result.backend,
+            str(result.images),
+            str(result.stale),
+            str(result.pulls),
+            f"{result.wall_time:.2f}s",
+            *delta,
+            str(result.docker_processes),
+            str(result.crane_processes),
+            str(result.engine_requests),
+            str(result.registry_requests),
+        )
+    return table
+
+
+class Registry(ThreadingHTTPServer):
+    """Registry v2 stand-in: anonymous, manifests only (the fake daemons never fetch blobs)."""
+
+    daemon_threads = True
+
+    def __init__(self, synthetic: Synthetic, latency: float) -> None:
+        super().__init__(("127.0.0.1", 0), RegistryHandler)
+        self.synthetic = synthetic
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self) -> Self:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    server: Registry
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        pass
+
+    def do_GET(self) -> None:
+        self.serve_manifest(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self.serve_manifest(send_body=False)
+
+    def serve_manifest(self, *, send_body: bool) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        # /v2/<repository>/manifests/<tag or digest>
+        repository, _, reference = self.path.removeprefix("/v2/").partition("/manifests/")
+        if (body := self.server.synthetic.manifest(repository, reference)) is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", _MANIFEST_TYPE)
+        self.send_header("Docker-Content-Digest", digest_of(body))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class EngineStub(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """The Engine API endpoints the updater calls, answered from the synthetic image set."""
+
+    daemon_threads = True
+
+    def __init__(self, socket: Path, synthetic: Synthetic, bandwidth: int) -> None:
+        super().__init__(str(socket), EngineHandler)
+        self.path = socket
+        self.synthetic = synthetic
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.pulls = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class EngineHandler(BaseHTTPRequestHandler):
+    server: EngineStub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        pass
+
+    def address_string(self) -> str:
+        return "docker.sock"
+
+    def count(self) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+
+    def send_json(self, payload: object, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.count()
+        path = self.path.partition("?")[0]
+        synthetic = self.server.synthetic
+        if path == "/images/json":
+            self.send_json([image.engine_summary(synthetic.host) for image in synthetic.images])
+        elif path.startswith("/images/") and (image := synthetic.by_id.get(path.split("/")[2])):
+            self.send_json({**image.engine_summary(synthetic.host), "Created": "2024-01-01T00:00:00Z", **synthetic.os})
+        elif path == "/containers/json":
+            self.send_json([])
+        elif path == "/info":
+            self.send_json({"DockerRootDir": "/nonexistent"})
+        else:
+            self.send_json({"message": "not found"}, 404)
+
+    def do_POST(self) -> None:
+        self.count()
+        if not self.path.startswith("/images/create"):
+            self.send_json({"SpaceReclaimed": 0})
+            return
+        with self.server.lock:
+            self.server.pulls += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        query = parse_qs(urlsplit(self.path).query)
+        image = f"{query['fromImage'][0]}:{query['tag'][0]}"
+        for layer, size in self.server.synthetic.pulls().get(image, {}).items():
+            time.sleep(size / self.server.bandwidth)
+            event = {"status": "Downloading", "id": layer[7:19], "progressDetail": {"current": size, "total": size}}
+            self.write_chunk(json.dumps(event).encode() + b"\r\n")
+        self.write_chunk(b"")
+
+    def do_DELETE(self) -> None:
+        self.count()
+        self.send_json([{"Untagged": self.path}])
+
+    def write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+def digest_of(body: bytes) -> str:
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def synthetic_layers(name: str, generation: str, opts: Options) -> list[tuple[str, int]]:
+    # Every image sits on one shared base layer, so the pull planner has sharing to exploit.
+    own = [digest_of(f"{name}/{generation}/{layer}".encode()) for layer in range(1, opts.layers)]
+    return [(digest_of(b"base layer"), opts.layer_size), *((digest, opts.layer_size) for digest in own)]
+
+
+def manifest_body(config: str, layers: list[tuple[str, int]]) -> bytes:
+    return json.dumps(
+        {
+            "schemaVersion": 2,
+            "mediaType": _MANIFEST_TYPE,
+            "config": {"mediaType": "application/vnd.oci.image.config.v1+json", "digest": config, "size": 1},
+            "layers": [
+                {"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "digest": digest, "size": size}
+                for digest, size in layers
+            ],
+        },
+        sort_keys=True,
+    ).encode()
+
+
+@dataclass
+class SyntheticImage:
+    name: str
+    old: bytes
+    new: bytes
+    stale: bool
+
+    @property
+    def installed(self) -> str:
+        return digest_of(self.old)
+
+    @property
+    def image_id(self) -> str:
+        # The image id is its config digest, which is what the updater's platform check compares.
+        return cast("str", json.loads(self.old)["config"]["digest"])
+
+    def engine_summary(self, host: str) -> dict[str, Any]:
+        return {
+            "Id": self.image_id,
+            "RepoTags": [f"{host}/{self.name}:latest"],
+            "RepoDigests": [f"{host}/{self.name}@{self.installed}"],
+            "Size": 10_000_000,
+        }
+
+    def fetched_layers(self) -> dict[str, int]:
+        old = {layer["digest"] for layer in json.loads(self.old)["layers"]}
+        return {
+            layer["digest"]: layer["size"] for layer in json.loads(self.new)["layers"] if layer["digest"] not in old
+        }
+
+
+@dataclass
+class Synthetic:
+    images: list[SyntheticImage]
+    host: str = ""
+    by_id: dict[str, SyntheticImage] = field(default_factory=dict)
+    manifests: dict[tuple[str, str], bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, count: int, opts: Options) -> Synthetic:
+        images: list[SyntheticImage] = []
+        stale_every = round(1 / opts.stale) if opts.stale else 0
+        for index in range(count):
+            name = f"bench/img{index}"
+            stale = bool(stale_every) and index % stale_every == 0
+            old = manifest_body(digest_of(f"{name}/old".encode()), synthetic_layers(name, "old", opts))
+            new = (
+                manifest_body(digest_of(f"{name}/new".encode()), synthetic_layers(name, "new", opts)) if stale else old
+            )
+            images.append(SyntheticImage(name, old, new, stale))
+        synthetic = cls(images)
+        for image in images:
+            synthetic.by_id[image.image_id] = image
+            for body in (image.old, image.new):
+                synthetic.manifests[image.name, digest_of(body)] = body
+            synthetic.manifests[image.name, "latest"] = image.new
+        return synthetic
+
+    @property
+    def os(self) -> dict[str, str]:
+        arch = {"x86_64": "amd64", "aarch64": "arm64"}.get(os.uname().machine, os.uname().machine)
+        return {"Os": "linux", "Architecture": arch}
+
+    def manifest(self, repository: str, reference: str) -> bytes | None:
+        return self.manifests.get((repository, reference))
+
+    def pulls(self) -> dict[str, dict[str, int]]:
+        return {f"{self.host}/{image.name}:latest": image.fetched_layers() for image in self.images}
+
+    def shim_state(self, bandwidth: int) -> dict[str, Any]:
+        return {
+            "images": [
+                {"tag": f"{self.host}/{image.name}:latest", "id": image.image_id, "digest": image.installed}
+                for image in self.images
+            ],
+            "remote": {f"{self.host}/{image.name}:latest": digest_of(image.new) for image in self.images},
+            "pulls": self.pulls(),
+            "platform": "/".join(self.os.values()),
+            "bandwidth": bandwidth,
+        }
+
+
+@dataclass
+class BenchResult:
+    backend: str
+    images: int
+    stale: int
+    wall_time: float
+    docker_processes: int
+    crane_processes: int
+    engine_requests: int
+    registry_requests: int
+    # Absent from results saved before pulls were counted.
+    pulls: int = 0
+
+
+if __name__ == "__main__":
+    main()
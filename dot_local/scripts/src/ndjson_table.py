@@ -1,20 +1,63 @@
 # /// script
 # requires-python = ">=3.14"
 # dependencies = [
+#     "orjson>=3.10",
 #     "rich>=14.2",
 # ]
 # ///
 from __future__ import annotations
 
 import argparse
-import json
+import hashlib
+import mmap
+import os
+import pickle
 import re
+import select
+import stat
 import sys
+import tempfile
+import termios
+import tty
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Final
 
-from rich.console import Console
+from rich.cells import cell_len
+from rich.console import Console, Group
+from rich.live import Live
 from rich.table import Table
+from rich.text import Text
+
+try:
+    from orjson import loads
+except ImportError:  # the stdlib parser is several times slower, but gives the same objects
+    from json import loads
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from typing import IO
+
+_MISSING: Final[object] = object()
+_PARALLEL_MIN_BYTES: Final[int] = 64 << 20
+_CHUNK_BYTES: Final[int] = 8 << 20
+_TYPECODES: Final[dict[type, str]] = {int: "q", float: "d"}
+_SCHEMA_TYPES: Final[dict[str, type]] = {"int": int, "float": float, "str": str, "bool": bool}
+# Rows a search parses between looks at the terminal, so a key typed meanwhile interrupts it.
+_SEARCH_STRIDE: Final[int] = 256
+_KEY_RE: Final[re.Pattern[str]] = re.compile(r"\x1b\[[0-9;]*[~A-Za-z]|\x1bO[A-Za-z]|.", re.DOTALL)
+_MIN_PARTIAL_WIDTH: Final[int] = 8
+_CACHE_DIR: Final[Path] = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ndjson_table"
+_INDEX_VERSION: Final[int] = 2
+# Lines per block of trigram postings: one block at a time is built, written and read back, and line numbers
+# within it fit in 16 bits.
+_TRIGRAM_BLOCK: Final[int] = 65536
+# A trigram in more lines of a block than this barely narrows a search, so it is noted as common instead of posted.
+_COMMON_TRIGRAM: Final[int] = _TRIGRAM_BLOCK // 10
 
 
 def main() -> None:
@@ -25,115 +68,516 @@ def main() -> None:
     parser.add_argument(
         "-s", "--search", help="Search for a value in any row (can be repeated)", nargs="*", default=None
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=None,
+        help="Worker processes parsing a -f file (default: all cores for files over 64MB, else 1)",
+    )
+    parser.add_argument(
+        "-P",
+        "--pager",
+        action="store_true",
+        help="Browse a -f file interactively, parsing only the rows on screen (arrows/hjkl scroll, / searches)",
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        action="store_true",
+        help="Keep an index of the -f file in the cache (line offsets, column types), rebuilt when the file changes",
+    )
+    parser.add_argument(
+        "--trigrams",
+        action="store_true",
+        help="Index the 3-character substrings of values as well (implies -i), so repeated --search runs read only "
+        "the lines that can match; the first run takes several times longer",
+    )
     args = parser.parse_args()
-    ndjson_table(args.file, selected_columns=args.columns, pivot=args.pivot, search=args.search)
+    ndjson_table(
+        args.file,
+        selected_columns=args.columns,
+        pivot=args.pivot,
+        search=args.search,
+        jobs=args.jobs,
+        pager=args.pager,
+        index=args.index or args.trigrams,
+        trigrams=args.trigrams,
+    )
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        msg = f"expected a positive integer, got {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+    return number
 
 
-def ndjson_table(  # noqa: C901, PLR0912, PLR0915
+def ndjson_table(  # noqa: C901, PLR0912, PLR0913
     filepath: str | None,
     selected_columns: list[str] | None = None,
     *,
     pivot: bool = False,
     search: list[str] | None = None,
+    jobs: int | None = None,
+    pager: bool = False,
+    index: bool = False,
+    trigrams: bool = False,
 ) -> None:
     console: Console = Console()
-    if filepath is None:
-        lines: list[str] = list(sys.stdin)
-    else:
+    # Paging, indexing and parallel parsing all map the file, so they need a regular one.
+    regular = Path(filepath) if filepath is not None and mappable(Path(filepath)) else None
+    if pager and (regular is None or pivot or not console.is_terminal):
+        console.print("[bold red]Error:[/bold red] --pager needs a regular -f file, no --pivot, and a terminal.")
+        return
+    with ExitStack() as stack:
+        # Lines are pulled one at a time from the file or stdin; nothing holds the whole input. They stay bytes:
+        # the parser takes UTF-8 directly, so decoding to str first would only cost a copy per line.
+        if filepath is None:
+            lines: Iterator[bytes] = iter(sys.stdin.buffer)
+        else:
+            try:
+                lines = stack.enter_context(Path(filepath).open("rb"))
+            except OSError as exc:
+                console.print(f"[bold red]Error:[/bold red] Cannot read {filepath}: {exc}")
+                return
+
+        if (first_line := next(lines, None)) is None:
+            console.print("[bold red]Error:[/bold red] Empty input.")
+            return
+
+        first_obj = parse_json_object(first_line)
+        if first_obj is None:
+            console.print("[bold red]Error:[/bold red] First line is not a JSON object.")
+            return
+
+        flat_first_obj = project(first_obj, selected_columns) if selected_columns else flatten(first_obj)
+        all_headers: list[str] = list(flat_first_obj.keys())
+        headers: list[str] = selected_columns or all_headers
+        type_map: dict[str, type] = {key: type(flat_first_obj[key]) for key in headers if key in flat_first_obj}
+
         try:
-            lines = Path(filepath).read_text(encoding="utf-8").splitlines()
-        except OSError as exc:
-            console.print(f"[bold red]Error:[/bold red] Cannot read {filepath}: {exc}")
+            patterns = [re.compile(pattern) for pattern in search or []]
+        except re.error as exc:
+            console.print(f"[bold red]Error:[/bold red] Invalid --search regex: {exc}")
             return
 
-    if not lines:
-        console.print("[bold red]Error:[/bold red] Empty input.")
-        return
+        def skipped(line: bytes) -> None:
+            console.print(f"[yellow]Skipping non-object JSON line:[/yellow] {line.strip().decode(errors='replace')}")
 
-    first_obj = parse_json_object(lines[0])
-    if first_obj is None:
-        console.print("[bold red]Error:[/bold red] First line is not a JSON object.")
-        return
+        selected = bool(selected_columns)
+        sidecar = SidecarIndex.open(regular, console, trigrams=trigrams) if index and regular is not None else None
+        if sidecar is not None:
+            if unknown := [col for col in selected_columns or [] if col not in sidecar.schema]:
+                console.print(f"[yellow]Not a column anywhere in {filepath}:[/yellow] {' '.join(unknown)}")
+            # The whole file's types, not just the first row's: a column null or text there may be numbers below.
+            type_map |= {key: kind for key in headers if (kind := schema_type(sidecar.schema.get(key, set())))}
+        if pager and regular is not None:
+            page(console, regular, headers, type_map, patterns, selected=selected, sidecar=sidecar)
+            return
+        if sidecar is not None and (candidates := sidecar.candidates(patterns)) is not None:
+            rows = matching_rows(sidecar.lines(candidates), headers, patterns, skipped, selected=selected)
+            batches = column_batches(rows, headers, screen_rows(console))
+        elif regular is not None and (jobs := jobs or default_jobs(regular)) > 1:
+            spans = chunk_spans(regular, 0)
+            batches = parallel_batches(regular, spans, headers, patterns, skipped, selected, jobs)
+        else:
+            rows = matching_rows(chain([first_line], lines), headers, patterns, skipped, selected=selected)
+            batches = column_batches(rows, headers, screen_rows(console))
+        if pivot:
+            print_pivot(console, batches, headers, type_map)
+        else:
+            print_rows(console, batches, type_map)
 
-    def flatten(obj: dict[str, object], parent_key: str = "") -> dict[str, object]:
-        items: dict[str, object] = {}
-        for key, value in obj.items():
-            new_key = f"{parent_key}.{key}" if parent_key else key
-            if isinstance(value, dict):
-                items.update(flatten(value, new_key))  # pyright: ignore [reportUnknownArgumentType]
-            elif isinstance(value, list) and value and isinstance(value[0], dict):
-                items.update(flatten(value[0], new_key))  # pyright: ignore [reportUnknownArgumentType]
-            else:
-                items[new_key] = value
-        return items
 
-    flat_first_obj = flatten(first_obj)
-    all_headers: list[str] = list(flat_first_obj.keys())
-    headers: list[str] = selected_columns or all_headers
-    type_map: dict[str, type] = {key: type(flat_first_obj[key]) for key in headers if key in flat_first_obj}
+def schema_type(names: set[str]) -> type | None:
+    """The type a column's values share across the file, with ints among floats read as floats; None if unseen."""
+    names = names - {"NoneType"}
+    if names == {"int", "float"}:
+        return float
+    if len(names) == 1 and (name := next(iter(names))) in _SCHEMA_TYPES:
+        return _SCHEMA_TYPES[name]
+    return str if names else None
+
 
+def default_jobs(path: Path) -> int:
     try:
-        patterns = [re.compile(pattern) for pattern in search or []]
-    except re.error as exc:
-        console.print(f"[bold red]Error:[/bold red] Invalid --search regex: {exc}")
-        return
+        large = path.stat().st_size >= _PARALLEL_MIN_BYTES
+    except OSError:
+        return 1
+    # Below this, starting the workers costs about what they would save.
+    return (os.process_cpu_count() or 1) if large else 1
+
+
+def mappable(path: Path) -> bool:
+    # A FIFO or a process substitution (<(...)) can be neither memory-mapped nor read a second time; those are only
+    # ever streamed once, serially.
+    try:
+        info = path.stat()
+    except OSError:
+        return False
+    return stat.S_ISREG(info.st_mode) and info.st_size > 0
+
+
+def chunk_spans(path: Path, start: int) -> Iterator[tuple[int, int]]:
+    """Split the file from `start` into byte ranges of about `_CHUNK_BYTES`, each ending at a newline."""
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        size = len(mapped)
+        while start < size:
+            cut = mapped.find(b"\n", start + _CHUNK_BYTES)
+            end = size if cut == -1 else cut + 1
+            yield start, end
+            start = end
+
+
+def parallel_batches(  # noqa: PLR0913, PLR0917
+    path: Path,
+    spans: Iterator[tuple[int, int]],
+    headers: list[str],
+    patterns: list[re.Pattern[str]],
+    skipped: Callable[[bytes], None],
+    selected: bool,  # noqa: FBT001
+    jobs: int,
+) -> Iterator[ColumnBatch]:
+    # Workers parse, flatten and search their chunk and send back only the displayed columns; results come back
+    # in file order, and at most two chunks per worker are in flight, so memory stays bounded.
+    scan = partial(scan_chunk, path, headers=headers, patterns=patterns, selected=selected)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for batch, rejected in executor.map(scan, spans, buffersize=2 * jobs):
+            for line in rejected:
+                skipped(line)
+            yield batch
+
+
+def scan_chunk(
+    path: Path, span: tuple[int, int], *, headers: list[str], patterns: list[re.Pattern[str]], selected: bool
+) -> tuple[ColumnBatch, list[bytes]]:
+    """Match the lines in a byte range of the file; runs in a worker process."""
+    start, end = span
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        lines = mapped[start:end].split(b"\n")
+    batch = ColumnBatch(headers)
+    rejected: list[bytes] = []
+    for row in matching_rows(lines, headers, patterns, rejected.append, selected=selected):
+        batch.append(row)
+    return batch, rejected
+
 
-    # Collect all flattened rows
-    flat_rows: list[dict[str, object]] = []
+def column_batches(rows: Iterable[dict[str, object]], headers: list[str], size: int) -> Iterator[ColumnBatch]:
+    batch = ColumnBatch(headers)
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = ColumnBatch(headers)
+    if len(batch):
+        yield batch
+
+
+def matching_rows(
+    lines: Iterable[bytes],
+    headers: list[str],
+    patterns: list[re.Pattern[str]],
+    skipped: Callable[[bytes], None],
+    *,
+    selected: bool,
+) -> Iterator[dict[str, object]]:
     for line in lines:
         if not line.strip():
             continue
         obj = parse_json_object(line)
         if obj is None:
-            console.print(f"[yellow]Skipping non-object JSON line:[/yellow] {line.strip()}")
+            skipped(line)
             continue
-        flat_obj = flatten(obj)
-        search_values = (
-            [str(flat_obj.get(col, "")) for col in headers] if selected_columns else [str(v) for v in flat_obj.values()]
-        )
-        if patterns and not all(any(pat.search(v) for v in search_values) for pat in patterns):
+        # With --columns only the selected paths are looked up, instead of flattening every field of every row.
+        flat_obj = project(obj, headers) if selected else flatten(obj)
+        if patterns and not matches(search_values(flat_obj, headers, selected=selected), patterns):
             continue
-        flat_rows.append(flat_obj)
+        yield flat_obj
 
-    # Filter out columns that are entirely empty: None, "", or numeric zero (but never boolean False)
-    def is_empty_column(key: str) -> bool:
-        for row in flat_rows:
-            value = row.get(key)
-            if value is None or value == "":
-                continue
-            if isinstance(value, (int, float)) and not isinstance(value, bool) and value == 0:
-                continue
+
+def search_values(flat_obj: dict[str, object], headers: list[str], *, selected: bool) -> list[str]:
+    return [str(flat_obj.get(col, "")) for col in headers] if selected else [str(v) for v in flat_obj.values()]
+
+
+def flat_row(line: bytes, headers: list[str], *, selected: bool) -> dict[str, object] | None:
+    if (obj := parse_json_object(line)) is None:
+        return None
+    return project(obj, headers) if selected else flatten(obj)
+
+
+def matches(values: list[str], patterns: list[re.Pattern[str]]) -> bool:
+    # Every pattern must hit some value; plain loops, as this runs once per input line.
+    for pattern in patterns:
+        for value in values:
+            if pattern.search(value):
+                break
+        else:
             return False
-        return True
+    return True
 
-    filtered_headers: list[str] = [key for key in headers if not is_empty_column(key)]
 
-    table: Table = Table(show_header=True, header_style="bold cyan")
-    if not pivot:
-        # Add sequence number as the first column
-        table.add_column("#", no_wrap=True, style="dim", justify="right")
-        for header in filtered_headers:
-            table.add_column(header, no_wrap=True)
-        for at, flat_obj in enumerate(flat_rows, 1):
-            row = [str(at)] + [format_value(col, flat_obj.get(col, None), type_map) for col in filtered_headers]
-            table.add_row(*row)
-    else:
-        # Pivot: columns become rows, rows become columns
-        table.add_column("Field", no_wrap=True)
-        for at in range(len(flat_rows)):
-            table.add_column(f"Row {at + 1}", no_wrap=True)
-        for col in filtered_headers:
-            values = [format_value(col, flat_obj.get(col, None), type_map) for flat_obj in flat_rows]
-            table.add_row(col, *values)
+def leaf_values(obj: dict[str, object]) -> Iterator[object]:
+    """Every value flatten would make a column of, including any a colliding dotted key would overwrite."""
+    for value in obj.values():
+        if isinstance(value, dict):
+            yield from leaf_values(value)  # pyright: ignore [reportUnknownArgumentType]
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            yield from leaf_values(value[0])  # pyright: ignore [reportUnknownArgumentType]
+        else:
+            yield value
+
+
+def required_literals(pattern: str) -> list[str]:
+    """
+    Substrings any match of `pattern` must contain, or none when that cannot be told cheaply.
+
+    Only patterns without groups, classes, alternation, escapes or counted repeats are read; those are split at the
+    remaining metacharacters, dropping the character a `*` or `?` makes optional.
+    """
+    if any(char in pattern for char in "|()[]{}\\"):
+        return []
+    runs: list[str] = []
+    current = ""
+    for char in pattern:
+        if char in ".^$+":
+            runs.append(current)
+            current = ""
+        elif char in "*?":
+            runs.append(current[:-1])
+            current = ""
+        else:
+            current += char
+    runs.append(current)
+    return [run for run in runs if len(run) >= 3]
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[at : at + 3] for at in range(len(text) - 2)}
+
+
+def block_candidates(grams: set[str], common: set[str], postings: dict[str, bytes], size: int) -> Iterable[int]:
+    """The lines of one index block holding every trigram; a common trigram, not posted, narrows nothing."""
+    found: set[int] | None = None
+    # Rarest first: the intersection is smallest soonest.
+    for gram in sorted(grams - common, key=lambda gram: len(postings.get(gram, b""))):
+        if (posting := postings.get(gram)) is None:
+            return ()
+        numbers = array("H", posting)
+        found = set(numbers) if found is None else found.intersection(numbers)
+        if not found:
+            return ()
+    return range(size) if found is None else found
+
+
+def flatten(obj: dict[str, object], parent_key: str = "") -> dict[str, object]:
+    items: dict[str, object] = {}
+    for key, value in obj.items():
+        new_key = f"{parent_key}.{key}" if parent_key else key
+        if isinstance(value, dict):
+            items.update(flatten(value, new_key))  # pyright: ignore [reportUnknownArgumentType]
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            items.update(flatten(value[0], new_key))  # pyright: ignore [reportUnknownArgumentType]
+        else:
+            items[new_key] = value
+    return items
+
+
+def project(obj: dict[str, object], columns: list[str]) -> dict[str, object]:
+    row: dict[str, object] = {}
+    for column in columns:
+        # A top-level scalar, the common case, needs no path walk.
+        value = obj.get(column, _MISSING)
+        if value is _MISSING or isinstance(value, (dict, list)):
+            value = extract(obj, column)
+        if value is not _MISSING:
+            row[column] = value
+    return row
+
+
+def extract(obj: object, path: str) -> object:
+    """Resolve a dotted column name to the value `flatten` would have put under it, or `_MISSING`."""
+    if isinstance(obj, list) and obj and isinstance(obj[0], dict):
+        obj = obj[0]
+    if not isinstance(obj, dict):
+        return _MISSING
+    if path in obj:
+        value = obj[path]
+        # Objects and lists of objects are expanded by flatten, so they never are a column of their own.
+        nested = isinstance(value, dict) or (isinstance(value, list) and value and isinstance(value[0], dict))
+        return _MISSING if nested else value
+    # A key may itself contain dots, so every split point is tried, shortest key first.
+    start = 0
+    while (dot := path.find(".", start)) != -1:
+        if (key := path[:dot]) in obj and (value := extract(obj[key], path[dot + 1 :])) is not _MISSING:
+            return value
+        start = dot + 1
+    return _MISSING
+
+
+def screen_rows(console: Console) -> int:
+    # Into a pipe nobody watches the first screen, so batches are larger to spend less time laying out tables.
+    return max(console.height - 4, 8) if console.is_terminal else 1000
+
+
+def print_rows(console: Console, batches: Iterable[ColumnBatch], type_map: dict[str, type]) -> None:
+    # Printed a screenful at a time, so output starts once the first screenful is parsed and memory holds one
+    # screenful however long the input. Which columns are empty is only known so far: one is shown from the first
+    # screenful that has a value in it, with a note. Batches are re-cut into screenfuls at fixed rows, so the output is
+    # the same whether the rows came in screenful batches or in the large chunks of parallel parsing. Columns only
+    # ever widen, and whenever the layout changes the header is printed again, so every stretch of rows lines up
+    # under the header above it.
+    shown: list[int] = []
+    widths: dict[str, int] = {}
+    layout: tuple[list[str], list[int]] | None = None
+    at = 0
+    for batch, start, stop in screenfuls(batches, screen_rows(console)):
+        if appeared := [
+            index for index, column in enumerate(batch.columns) if index not in shown and column.has_values(start, stop)
+        ]:
+            shown = sorted([*shown, *appeared])
+            if at:
+                names = ", ".join(batch.headers[index] for index in appeared)
+                console.print(f"[yellow]From row {at + 1} on, columns empty until now have values:[/yellow] {names}")
+        header = ["#", *(batch.headers[index] for index in shown)]
+        text = [
+            [str(number) for number in range(at + 1, at + stop - start + 1)],
+            *(batch.columns[index].formatted(batch.headers[index], type_map, start, stop) for index in shown),
+        ]
+        for name, column in zip(header, text, strict=True):
+            widths[name] = max(widths.get(name, cell_len(name)), *map(cell_len, column))
+        fitted = fit_widths([widths[name] for name in header], console.width - 3 * len(header) + 1)
+        show_header = layout != (header, fitted)
+        layout = header, fitted
+        console.print(rows_table(header, list(zip(*text, strict=True)), fitted, show_header=show_header))
+        at += stop - start
+    if not at:
+        # Still a table, as before streaming, so "ran and matched nothing" reads differently from no output at all.
+        console.print(rows_table(["#"], [], [1], show_header=True))
+        console.print("[dim]No matching rows.[/dim]")
+
+
+def screenfuls(batches: Iterable[ColumnBatch], size: int) -> Iterator[tuple[ColumnBatch, int, int]]:
+    """Cut batches of any length into row ranges of `size`, copying only the rows either side of a batch boundary."""
+    carry: ColumnBatch | None = None
+    for batch in batches:
+        start = 0
+        if carry is not None:
+            start = min(size - len(carry), len(batch))
+            carry.extend(batch, 0, start)
+            if len(carry) < size:
+                continue
+            yield carry, 0, size
+            carry = None
+        while len(batch) - start >= size:
+            yield batch, start, start + size
+            start += size
+        if start < len(batch):
+            carry = ColumnBatch(batch.headers)
+            carry.extend(batch, start, len(batch))
+    if carry is not None:
+        yield carry, 0, len(carry)
+
+
+def fit_widths(widths: list[int], available: int) -> list[int]:
+    # Cap the widest columns at the largest width that fits, so every batch lays out identically.
+    if sum(widths) <= available:
+        return widths
+    low, high = 1, max(widths)
+    while low < high:
+        cap = (low + high + 1) // 2
+        low, high = (cap, high) if sum(min(width, cap) for width in widths) <= available else (low, cap - 1)
+    return [min(width, low) for width in widths]
+
+
+def rows_table(
+    header: list[str],
+    cells: list[tuple[str, ...]],
+    widths: list[int],
+    *,
+    show_header: bool,
+    highlight: int | None = None,
+) -> Table:
+    table: Table = Table(show_header=show_header, header_style="bold cyan", show_edge=False)
+    # Add sequence number as the first column
+    table.add_column(header[0], no_wrap=True, style="dim", justify="right", width=widths[0])
+    for name, width in zip(header[1:], widths[1:], strict=True):
+        table.add_column(name, no_wrap=True, width=width)
+    for at, row in enumerate(cells):
+        table.add_row(*row, style="reverse" if at == highlight else None)
+    return table
 
+
+def page(  # noqa: PLR0913
+    console: Console,
+    path: Path,
+    headers: list[str],
+    type_map: dict[str, type],
+    patterns: list[re.Pattern[str]],
+    *,
+    selected: bool,
+    sidecar: SidecarIndex | None = None,
+) -> None:
+    def accept(line: bytes) -> bool:
+        row = flat_row(line, headers, selected=selected)
+        return row is not None and matches(search_values(row, headers, selected=selected), patterns)
+
+    candidates = sidecar.candidates(patterns) if sidecar is not None else None
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = RowIndex(
+            mapped,
+            accept if patterns else None,
+            None if sidecar is None or candidates is None else array("q", (sidecar.offsets[n] for n in candidates)),
+        )
+        if sidecar is not None and not patterns:
+            # Unfiltered rows are exactly the indexed lines, so the whole file is addressable from the start.
+            index.offsets, index.scanned = sidecar.offsets, len(mapped)
+        Pager(console, index, headers, type_map, selected=selected).run()
+
+
+def compile_query(query: str) -> re.Pattern[str] | None:
+    if not query:
+        return None
+    try:
+        return re.compile(query)
+    except re.error:
+        # Mid-typing a regex is often unbalanced; until it parses, look for the text as typed.
+        return re.compile(re.escape(query))
+
+
+def print_pivot(
+    console: Console, batches: Iterable[ColumnBatch], headers: list[str], type_map: dict[str, type]
+) -> None:
+    # Pivot: columns become rows, rows become columns; every row is a column, so the input is held in full
+    merged = ColumnBatch(headers)
+    for batch in batches:
+        merged.extend(batch, 0, len(batch))
+    table: Table = Table(show_header=True, header_style="bold cyan")
+    table.add_column("Field", no_wrap=True)
+    for at in range(len(merged)):
+        table.add_column(f"Row {at + 1}", no_wrap=True)
+    for col, column in zip(merged.headers, merged.columns, strict=True):
+        if not column.empty:
+            table.add_row(col, *column.formatted(col, type_map, 0, len(merged)))
     console.print(table)
 
 
-def parse_json_object(line: str) -> dict[str, object] | None:
+def is_empty_value(value: object) -> bool:
+    # Empty means None, "", or numeric zero (but never boolean False)
+    if value is None or value == "":
+        return True
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == 0
+
+
+def parse_json_object(line: bytes) -> dict[str, object] | None:
     """Parse an NDJSON line, returning the object or None if it is invalid or not a JSON object."""
     try:
-        obj = json.loads(line)
-    except json.JSONDecodeError:
+        obj = loads(line)
+    except ValueError:
         return None
     return obj if isinstance(obj, dict) else None
 
@@ -159,5 +603,495 @@ def format_value(key: str, value: Any, type_map: dict[str, type]) -> str:  # noq
     return str(value)
 
 
+class Column:
+    """
+    One column of a batch: an `array` while its values are all ints or all floats, a list otherwise.
+
+    Nulls (missing or None) are kept in a bitmap beside the values, so a numeric column stays a typed array through
+    them, and whether the column is empty is tracked as values arrive instead of rescanning it.
+    """
+
+    def __init__(self) -> None:
+        self.values: array[int] | array[float] | list[object] = []
+        self.nulls = bytearray()
+        self.null_count = 0
+        self.empty = True
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: object) -> None:
+        index = len(self.values)
+        if not index & 7:
+            self.nulls.append(0)
+        if value is None:
+            self.nulls[index >> 3] |= 1 << (index & 7)
+            self.null_count += 1
+            self.values.append(0 if isinstance(self.values, array) else None)  # pyright: ignore [reportArgumentType]
+            return
+        if self.empty and not is_empty_value(value):
+            self.empty = False
+        if isinstance(self.values, array):
+            if type(value) is (int if self.values.typecode == "q" else float):
+                try:
+                    self.values.append(value)  # pyright: ignore [reportArgumentType]
+                except OverflowError:
+                    pass
+                else:
+                    return
+            # A value the array cannot hold turns the column into a plain list for good.
+            self.values = self.between(0, index)
+        elif self.null_count == index and (typecode := _TYPECODES.get(type(value))):
+            # The first value decides the type; nulls before it become zeroed slots under the bitmap.
+            self.values = array(typecode, bytes(8 * index))
+        self.values.append(value)  # pyright: ignore [reportArgumentType]
+
+    def extend(self, other: Column, start: int, stop: int) -> None:
+        for value in other.between(start, stop):
+            self.append(value)
+
+    def between(self, start: int, stop: int) -> list[object]:
+        values: list[object] = list(self.values[start:stop])
+        if isinstance(self.values, array):
+            for index in self.null_indexes(start, stop):
+                values[index - start] = None
+        return values
+
+    def has_values(self, start: int, stop: int) -> bool:
+        """Whether the slice holds a non-empty value; the whole-column flag answers for most columns at once."""
+        return not self.empty and not all(map(is_empty_value, self.between(start, stop)))
+
+    def null_indexes(self, start: int, stop: int) -> Iterator[int]:
+        if self.null_count:
+            nulls = self.nulls
+            yield from (index for index in range(start, stop) if nulls[index >> 3] >> (index & 7) & 1)
+
+    def formatted(self, key: str, type_map: dict[str, type], start: int, stop: int) -> list[str]:
+        """Format a slice of the column, in one pass over a typed array where the column has one."""
+        values = self.values
+        if (
+            isinstance(values, array)
+            and type_map.get(key, int) in {int, float}
+            and not (key == "size" and values.typecode == "q")
+        ):
+            text = [f"{value:_}" for value in values[start:stop]]
+            for index in self.null_indexes(start, stop):
+                text[index - start] = ""
+            return text
+        return [format_value(key, value, type_map) for value in self.between(start, stop)]
+
+
+class ColumnBatch:
+    """Rows stored column-wise: every header once, then one `Column` per header instead of a dict per row."""
+
+    def __init__(self, headers: list[str]) -> None:
+        self.headers = [sys.intern(header) for header in headers]
+        self.columns = [Column() for _ in headers]
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, row: dict[str, object]) -> None:
+        for header, column in zip(self.headers, self.columns, strict=True):
+            column.append(row.get(header))
+        self.length += 1
+
+    def extend(self, other: ColumnBatch, start: int, stop: int) -> None:
+        for column, more in zip(self.columns, other.columns, strict=True):
+            column.extend(more, start, stop)
+        self.length += stop - start
+
+
+class RowIndex:
+    """
+    Byte offsets of the rows of a mapped file, found only as far as the viewer has reached.
+
+    Without --search only newlines are scanned; with it each line is parsed as the index passes it, since whether it
+    is a row depends on its content. Given the offsets of candidate lines from a sidecar index, only those are parsed.
+    """
+
+    def __init__(
+        self, mapped: mmap.mmap, accept: Callable[[bytes], bool] | None, candidates: array[int] | None = None
+    ) -> None:
+        self.mapped = mapped
+        self.accept = accept
+        self.candidates = candidates
+        self.offsets: array[int] = array("q")
+        self.scanned = 0
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def complete(self) -> bool:
+        if self.candidates is not None:
+            return self.scanned >= len(self.candidates)
+        return self.scanned >= len(self.mapped)
+
+    def ensure(self, rows: int) -> int:
+        """Index up to `rows` rows, or to the end of the file; return how many rows are indexed."""
+        mapped, size = self.mapped, len(self.mapped)
+        if self.candidates is not None:
+            # Here `scanned` counts candidates, not bytes.
+            while len(self.offsets) < rows and self.scanned < len(self.candidates):
+                start = self.candidates[self.scanned]
+                self.scanned += 1
+                end = size if (cut := mapped.find(b"\n", start)) == -1 else cut
+                if self.accept is None or self.accept(mapped[start:end]):
+                    self.offsets.append(start)
+            return len(self.offsets)
+        while len(self.offsets) < rows and self.scanned < size:
+            start = self.scanned
+            end = size if (cut := mapped.find(b"\n", start)) == -1 else cut
+            self.scanned = end + 1
+            # Looking at the first byte spares copying the line, unless it starts with whitespace.
+            if end == start or (mapped[start] in b" \t\r" and not mapped[start:end].strip()):
+                continue
+            if self.accept is None or self.accept(mapped[start:end]):
+                self.offsets.append(start)
+        return len(self.offsets)
+
+    def line(self, row: int) -> bytes:
+        start = self.offsets[row]
+        end = self.mapped.find(b"\n", start)
+        return self.mapped[start : len(self.mapped) if end == -1 else end]
+
+
+class Pager:
+    """
+    Full-screen view of a window of rows and columns; only the rows on screen are ever parsed.
+
+    j/k or the arrows scroll a row, space/b or PgDn/PgUp a page, g/G jump to the ends and h/l move across columns.
+    / starts an incremental search that moves to the first matching row as the pattern is typed; n/N repeat it
+    forward and backward, and q quits. A search stops when a key is pressed, so typing never waits on a scan of the
+    file; n picks it up from where it stopped.
+    """
+
+    def __init__(
+        self, console: Console, index: RowIndex, headers: list[str], type_map: dict[str, type], *, selected: bool
+    ) -> None:
+        self.console = console
+        self.index = index
+        self.headers = headers
+        self.type_map = type_map
+        self.selected = selected
+        self.top = 0
+        self.left = 0
+        # Widths only grow, so columns do not jitter while scrolling.
+        self.widths: dict[str, int] = {header: cell_len(header) for header in headers}
+        self.rows: dict[int, dict[str, object] | None] = {}
+        self.prompt: str | None = None
+        self.query = ""
+        self.pattern: re.Pattern[str] | None = None
+        self.match: int | None = None
+        self.stopped: int | None = None
+        self.origin = 0
+        self.fd: int | None = None
+
+    @property
+    def height(self) -> int:
+        return max(self.console.height - 4, 1)
+
+    def run(self) -> None:
+        # Keys come from the terminal itself, so the pager works whatever stdin is.
+        fd = self.fd = os.open("/dev/tty", os.O_RDONLY)
+        saved = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            with Live(self.view(), console=self.console, screen=True, auto_refresh=False) as live:
+                # One read may hold several keys: typed ahead, pasted, or an escape sequence per arrow. An empty read
+                # means the terminal went away, which quits like q.
+                while (data := os.read(fd, 256)) and all(
+                    self.handle(key) for key in _KEY_RE.findall(data.decode(errors="ignore"))
+                ):
+                    live.update(self.view(), refresh=True)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+            os.close(fd)
+            self.fd = None
+
+    def pending(self) -> bool:
+        """Whether a key is waiting to be read."""
+        return self.fd is not None and bool(select.select([self.fd], [], [], 0)[0])
+
+    def handle(self, key: str) -> bool:  # noqa: C901, PLR0912
+        if self.prompt is not None:
+            self.edit(key)
+            return True
+        match key:
+            case "q" | "\x1b":
+                return False
+            case "j" | "\x1b[B":
+                self.scroll(1)
+            case "k" | "\x1b[A":
+                self.scroll(-1)
+            case " " | "f" | "\x1b[6~":
+                self.scroll(self.height)
+            case "b" | "\x1b[5~":
+                self.scroll(-self.height)
+            case "g" | "\x1b[H" | "\x1b[1~":
+                self.top = 0
+            case "G" | "\x1b[F" | "\x1b[4~":
+                self.top = max(self.index.ensure(sys.maxsize) - self.height, 0)
+            case "l" | "\x1b[C":
+                self.left = min(self.left + 1, len(self.headers) - 1)
+            case "h" | "\x1b[D":
+                self.left = max(self.left - 1, 0)
+            case "/":
+                self.prompt, self.origin = "", self.top
+            case "n":
+                self.find(self.resume(self.top) if self.match is None else self.match + 1, 1)
+            case "N":
+                self.find(self.resume(self.top - 1) if self.match is None else self.match - 1, -1)
+        return True
+
+    def edit(self, key: str) -> None:
+        prompt = self.prompt or ""
+        if key in {"\r", "\n"}:
+            self.prompt = None
+            return
+        if key == "\x1b":
+            self.prompt, self.query, self.pattern, self.match, self.top = None, "", None, None, self.origin
+            self.stopped = None
+            return
+        if key in {"\x7f", "\b"}:
+            prompt = prompt[:-1]
+        elif key.isprintable():
+            prompt += key
+        self.prompt = self.query = prompt
+        self.pattern = compile_query(prompt)
+        self.match = None
+        self.find(self.origin, 1)
+
+    def scroll(self, delta: int) -> None:
+        last_top = max(self.index.ensure(self.top + delta + self.height) - self.height, 0)
+        self.top = max(min(self.top + delta, last_top), 0)
+
+    def resume(self, row: int) -> int:
+        return row if self.stopped is None else self.stopped
+
+    def find(self, row: int, step: int) -> None:
+        # Search parses rows as it goes, bypassing the cache that only holds what is on screen.
+        self.stopped = None
+        if self.pattern is None:
+            return
+        start = row
+        while 0 <= row < self.index.ensure(row + 1):
+            if (row - start) % _SEARCH_STRIDE == _SEARCH_STRIDE - 1 and self.pending():
+                self.stopped = row
+                return
+            flat = flat_row(self.index.line(row), self.headers, selected=self.selected)
+            if flat is not None and matches(search_values(flat, self.headers, selected=self.selected), [self.pattern]):
+                self.match = row
+                if not self.top <= row < self.top + self.height:
+                    self.top = max(row - self.height // 3, 0)
+                return
+            row += step
+
+    def view(self) -> Group:
+        end = min(self.top + self.height, self.index.ensure(self.top + self.height))
+        self.rows = {
+            row: self.rows[row]
+            if row in self.rows
+            else flat_row(self.index.line(row), self.headers, selected=self.selected)
+            for row in range(self.top, end)
+        }
+        numbers = [str(row + 1) for row in range(self.top, end)]
+        shown: list[str] = []
+        text: list[list[str]] = []
+        used = max(cell_len(numbers[-1]) if numbers else 1, 1) + 1
+        for header in self.headers[self.left :]:
+            column = [
+                format_value(header, flat.get(header), self.type_map) if flat is not None else ""
+                for flat in self.rows.values()
+            ]
+            width = self.widths[header] = max(self.widths[header], *map(cell_len, column), 0)
+            if shown and used + 3 + min(width, _MIN_PARTIAL_WIDTH) > self.console.width:
+                break
+            shown.append(header)
+            text.append(column)
+            used += 3 + width
+            # A column that does not fit whole is still shown, cut to the room left; the next one would not be.
+            if used > self.console.width:
+                break
+        widths = [len(numbers[-1]) if numbers else 1, *(self.widths[header] for header in shown)]
+        fitted = fit_widths(widths, self.console.width - 3 * len(widths) + 1)
+        highlight = None if self.match is None else self.match - self.top
+        cells = list(zip(numbers, *text, strict=True))
+        table = rows_table(["#", *shown], cells, fitted, show_header=True, highlight=highlight)
+        return Group(table, self.footer(end, len(shown)))
+
+    def footer(self, end: int, shown: int) -> Text:
+        total = f"{len(self.index)}{'' if self.index.complete else '+'}"
+        columns = f"{self.left + 1}-{self.left + shown}" if shown else "0"
+        status = f" rows {min(self.top + 1, end)}-{end} of {total} | columns {columns} of {len(self.headers)}"
+        if self.prompt is not None:
+            search = f" | /{self.prompt}_"
+        elif self.query:
+            if self.match is not None:
+                outcome = ""
+            elif self.stopped is not None:
+                outcome = f"(stopped at row {self.stopped + 1}; n continues)"
+            else:
+                outcome = "(no match)"
+            search = f" | /{self.query} {outcome}"
+        else:
+            search = ""
+        keys = " | arrows/hjkl scroll, / search, n/N next/previous, q quit"
+        return Text.assemble((status, "bold"), (search, "yellow"), (keys, "dim"))
+
+
+class SidecarIndex:
+    """
+    What one full pass over a file learned, kept in the cache for later queries on the same file.
+
+    Keyed by the resolved path, size and mtime, so an edited or replaced file is indexed afresh. It holds the offset
+    of every non-blank line and the flattened schema with the value types seen per column. With --trigrams it also
+    holds, per block of lines, the lines holding each 3-character substring of a value; a `--search` whose pattern
+    requires literal text then only reads the lines holding all of its trigrams, and still matches each of them for
+    real. The blocks are written to the cache file as they are built and read back one at a time, so neither
+    building nor searching holds the postings of the whole file, and the main record follows them at the end.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: Path,
+        offsets: array[int],
+        invalid: array[int],
+        schema: dict[str, set[str]],
+        blocks: list[int] | None,
+        *,
+        cache: Path | None = None,
+    ) -> None:
+        self.path = path
+        self.offsets = offsets
+        self.invalid = invalid
+        self.schema = schema
+        self.blocks = blocks
+        self.cache = cache
+        self.identity: tuple[int, int] | None = None
+
+    @classmethod
+    def open(cls, path: Path, console: Console, *, trigrams: bool) -> SidecarIndex | None:
+        try:
+            info = path.stat()
+        except OSError:
+            return None
+        key = (str(path.resolve()), info.st_size, info.st_mtime_ns)
+        cache = _CACHE_DIR / f"{hashlib.sha256(key[0].encode()).hexdigest()[:16]}.idx"
+        try:
+            # Only ever written by this script, into the user's own cache directory.
+            with cache.open("rb") as handle:
+                handle.seek(-8, os.SEEK_END)
+                handle.seek(int.from_bytes(handle.read(8), "little"))
+                data = pickle.load(handle)
+                cached = os.fstat(handle.fileno())
+            if (
+                data["version"] == _INDEX_VERSION
+                and data["key"] == key
+                and (data["blocks"] is not None or not trigrams)
+            ):
+                sidecar = cls(path, data["offsets"], data["invalid"], data["schema"], data["blocks"], cache=cache)
+                sidecar.identity = cached.st_ino, cached.st_mtime_ns
+                return sidecar
+        except OSError, EOFError, ValueError, pickle.UnpicklingError, KeyError, TypeError:
+            # A missing, stale or corrupt index costs one rebuild.
+            pass
+        try:
+            # The temporary file comes first: where the cache cannot be written, the pass to build the index is not
+            # worth paying. Its name is unique, so concurrent runs on one file do not write into each other.
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            handle = tempfile.NamedTemporaryFile(dir=cache.parent, suffix=".tmp", delete=False)  # noqa: SIM115
+        except OSError as exc:
+            console.print(f"[yellow]Not indexing {path}:[/yellow] {exc}")
+            return None
+        temp = Path(handle.name)
+        try:
+            with handle:
+                built = cls.build(path, handle if trigrams else None)
+                start = handle.tell()
+                data = {"version": _INDEX_VERSION, "key": key} | {
+                    name: getattr(built, name) for name in ("offsets", "invalid", "schema", "blocks")
+                }
+                pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                handle.write(start.to_bytes(8, "little"))
+            temp.replace(cache)
+            cached = cache.stat()
+        except OSError as exc:
+            temp.unlink(missing_ok=True)
+            console.print(f"[yellow]Not indexing {path}:[/yellow] {exc}")
+            return None
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+        built.cache, built.identity = cache, (cached.st_ino, cached.st_mtime_ns)
+        console.print(f"[dim]Indexed {len(built.offsets):_} lines of {path} into {cache}[/dim]")
+        return built
+
+    @classmethod
+    def build(cls, path: Path, postings: IO[bytes] | None) -> SidecarIndex:
+        """Index the file; with a `postings` file, append each block of trigram postings to it as it is done."""
+        invalid: array[int] = array("I")
+        schema: dict[str, set[str]] = {}
+        blocks: list[int] | None = None if postings is None else []
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            rows = RowIndex(mapped, None)
+            rows.ensure(sys.maxsize)
+            for first in range(0, len(rows), _TRIGRAM_BLOCK):
+                block: dict[str, array[int]] = {}
+                for number in range(first, min(first + _TRIGRAM_BLOCK, len(rows))):
+                    if (obj := parse_json_object(rows.line(number))) is None:
+                        invalid.append(number)
+                        continue
+                    for key, value in flatten(obj).items():
+                        schema.setdefault(key, set()).add(type(value).__name__)
+                    if postings is None:
+                        continue
+                    grams: set[str] = set()
+                    for value in leaf_values(obj):
+                        grams |= trigrams(str(value))
+                    for gram in grams:
+                        if (posting := block.get(gram)) is None:
+                            posting = block[gram] = array("H")
+                        posting.append(number - first)
+                if postings is not None and blocks is not None:
+                    common = {gram for gram, posting in block.items() if len(posting) > _COMMON_TRIGRAM}
+                    kept = {gram: posting.tobytes() for gram, posting in block.items() if gram not in common}
+                    blocks.append(postings.tell())
+                    pickle.dump((common, kept), postings, protocol=pickle.HIGHEST_PROTOCOL)
+        return cls(path, rows.offsets, invalid, schema, blocks)
+
+    def candidates(self, patterns: list[re.Pattern[str]]) -> list[int] | None:
+        """Line numbers that can match every pattern, or None when no pattern narrows the search."""
+        grams = set().union(*(trigrams(text) for pattern in patterns for text in required_literals(pattern.pattern)))
+        if not grams or self.blocks is None or self.cache is None:
+            return None
+        found: list[int] = []
+        try:
+            with self.cache.open("rb") as handle:
+                # Replaced by another run since it was opened, the blocks may sit elsewhere; then read every line.
+                cached = os.fstat(handle.fileno())
+                if (cached.st_ino, cached.st_mtime_ns) != self.identity:
+                    return None
+                for at, position in enumerate(self.blocks):
+                    handle.seek(position)
+                    common, postings = pickle.load(handle)
+                    first = at * _TRIGRAM_BLOCK
+                    size = min(_TRIGRAM_BLOCK, len(self.offsets) - first)
+                    found.extend(first + number for number in block_candidates(grams, common, postings, size))
+        except OSError, EOFError, ValueError, pickle.UnpicklingError:
+            return None
+        # Lines that are not JSON objects are passed through, to be reported the same as without the index.
+        return sorted({*found, *self.invalid})
+
+    def lines(self, numbers: list[int]) -> Iterator[bytes]:
+        with self.path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for number in numbers:
+                start = self.offsets[number]
+                end = mapped.find(b"\n", start)
+                yield mapped[start : len(mapped) if end == -1 else end]
+
+
 if __name__ == "__main__":
     main()
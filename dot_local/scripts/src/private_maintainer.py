@@ -10,23 +10,44 @@
 
 from __future__ import annotations
 
+import html
+import json
+import math
 import os
+import sys
+import tempfile
+import threading
+import time
 import webbrowser
 from argparse import ArgumentParser, Namespace
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import TYPE_CHECKING
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, Self
 
 from github import Github
 from github.Auth import Token
+from github.Consts import DEFAULT_BASE_URL
 from github.GithubException import GithubException
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.live import Live
+from rich.markup import escape
 from rich.table import Table
 from rich_argparse import RichHelpFormatter
 from truststore import inject_into_ssl
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
+
+    from github.CheckRun import CheckRun
+    from github.CommitStatus import CommitStatus
     from github.PullRequest import PullRequest
+    from github.Requester import RequestsResponse
 
 # Mirrors the primary and maintenance projects in bernat-tech/data/projects.yaml (presentations excluded);
 # keep both in sync. Monorepo components are covered by their parent repo (tox-dev/toml-fmt).
@@ -74,13 +95,25 @@ REPOSITORIES = [
 ]
 
 BOT_AUTHORS = frozenset({"dependabot[bot]", "pre-commit-ci[bot]"})
+# Replayed bodies are re-encoded, so the recorded transport framing no longer applies.
+UNREPLAYABLE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+VERDICT_STYLE = {
+    "mergeable": "green",
+    "approving": "yellow",
+    "merging": "yellow",
+    "merged": "bold green",
+    "merge-failed": "red",
+    "failed": "red",
+}
 
 
 def main() -> None:
     opts = parse_cli()
-    console = Console()
+    # With the report on stdout, progress and tables go to stderr so the NDJSON stays parseable.
+    console = Console(stderr=opts.report == "-")
 
-    token = os.environ.get("GITHUB_TOKEN")
+    # The replay server never checks credentials, so a cassette can be replayed without a token.
+    token = "replay" if opts.replay else os.environ.get("GITHUB_TOKEN")
     if not token:
         console.print("[red]GITHUB_TOKEN not set, cannot continue.[/red]")
         raise SystemExit(1)
@@ -99,6 +132,12 @@ def main() -> None:
 class Options(Namespace):
     dry_run: bool
     verbose: bool
+    report: str | None
+    latency_summary: bool
+    record: str | None
+    replay: str | None
+    replay_latency: float
+    replay_rate_limit: int
 
 
 def parse_cli() -> Options:
@@ -108,154 +147,251 @@ def parse_cli() -> Options:
     )
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without actually merging")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="Write an NDJSON run report (one record per repo, per PR and per run) to PATH, or '-' for stdout",
+    )
+    parser.add_argument(
+        "--latency-summary", action="store_true", help="Print p50/p95 API latency per call type after the run"
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="PATH", help="Record every GitHub API exchange of this run to PATH")
+    cassette.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Serve the GitHub API from a recorded cassette via a local server instead of the network",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Latency in milliseconds injected into every replayed response (default: 0)",
+    )
+    parser.add_argument(
+        "--replay-rate-limit",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Requests allowed per minute by the replay server before it answers 403 (default: 0, unlimited)",
+    )
     opts = Options()
     parser.parse_args(namespace=opts)
+    if not opts.replay and (opts.replay_latency or opts.replay_rate_limit):
+        parser.error("--replay-latency and --replay-rate-limit only apply with --replay")
     return opts
 
 
 def run(console: Console, token: str, opts: Options) -> None:
     """Main execution function."""
+    with api_endpoint(console, opts) as api_url:
+        scan_and_merge(console, token, opts, api_url)
+
+
+def scan_and_merge(console: Console, token: str, opts: Options, api_url: str) -> None:
+    report = RunReport()
     console.print("[bold cyan]🔍 Scanning repositories for open PRs...[/bold cyan]")
 
-    mergeable_prs, failed_prs = scan_repositories(console, token)
+    mergeable_prs, failed_prs = scan_repositories(console, token, opts, report, api_url)
 
     console.print()
     console.print(f"[bold]Found {len(mergeable_prs)} mergeable PRs and {len(failed_prs)} failed PRs[/bold]")
     console.print()
 
-    if mergeable_prs:
-        display_mergeable_prs(console, mergeable_prs)
-        process_mergeable_prs(console, opts, mergeable_prs)
-
-    if failed_prs:
-        display_failed_prs(console, failed_prs)
-        if not opts.dry_run:
-            open_failed_prs(console, failed_prs)
+    if failed_prs and not opts.dry_run and not opts.replay:
+        open_failed_prs(console, failed_prs, report)
 
     if not mergeable_prs and not failed_prs:
         console.print("[green]✨ No open PRs found![/green]")
 
+    report.finish()
+    if opts.report:
+        write_report(console, report, opts.report)
+    if opts.latency_summary:
+        display_latency_summary(console, report)
+
 
 def scan_repositories(
-    console: Console, token: str
+    console: Console, token: str, opts: Options, report: RunReport, api_url: str
 ) -> tuple[list[tuple[str, PullRequest, str]], list[tuple[str, PullRequest, str]]]:
-    """Scan all repositories for open PRs and categorize them."""
+    """
+    Scan all repositories for open PRs, streaming each repo's results as soon as its scan finishes.
+
+    A repo's mergeable PRs are handed to the merge pool right away, so the run takes about as long as the slowest
+    repo rather than scan-all plus merge-all. Each repo is merged serially on one worker: its PR objects share the
+    client of the thread that scanned them.
+    """
     mergeable_prs: list[tuple[str, PullRequest, str]] = []
     failed_prs: list[tuple[str, PullRequest, str]] = []
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Scanning repositories...", total=len(REPOSITORIES))
-
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_repo = {
-                executor.submit(scan_single_repository, token, repo_path): repo_path for repo_path in REPOSITORIES
-            }
-
-            for future in as_completed(future_to_repo):
-                repo_path = future_to_repo[future]
-                try:
-                    repo_mergeable, repo_failed, pr_titles, repo_name = future.result()
-                    mergeable_prs.extend(repo_mergeable)
-                    failed_prs.extend(repo_failed)
-
-                    if pr_titles:
-                        pr_word = "PR" if len(pr_titles) == 1 else "PRs"
-                        console.print(f"[green]✓[/green] {repo_name}: {len(pr_titles)} open {pr_word}")
-                        for title in pr_titles:
-                            console.print(f"  [dim]{title}[/dim]")
-
-                except (GithubException, OSError, ValueError) as e:
-                    console.print(f"[yellow]⚠ {repo_path}: Could not fetch PRs ({e})[/yellow]")
-
-                progress.advance(task)
-
+    # Only this thread appends rows; workers just update the verdict on records already listed here.
+    rows: list[tuple[str, PullRequest, PrRecord]] = []
+    merges: list[Future[None]] = []
+
+    with (
+        Live(render_pipeline(rows, 0), console=console, refresh_per_second=8) as live,
+        ThreadPoolExecutor(max_workers=10) as executor,
+        ThreadPoolExecutor(max_workers=4) as merger,
+    ):
+        future_to_repo = {
+            executor.submit(scan_single_repository, token, repo_path, report.repo(repo_path), api_url): repo_path
+            for repo_path in REPOSITORIES
+        }
+
+        for scanned, future in enumerate(as_completed(future_to_repo), 1):
+            repo_path = future_to_repo[future]
+            try:
+                repo_mergeable, repo_failed, repo_name = future.result()
+            except (GithubException, OSError, ValueError) as e:
+                report.repo(repo_path).error = str(e)
+                console.print(f"[yellow]⚠ {repo_path}: Could not fetch PRs ({e})[/yellow]")
+            else:
+                mergeable_prs.extend(repo_mergeable)
+                failed_prs.extend(repo_failed)
+                for _repo_name, pr, _detail in sorted(
+                    [*repo_mergeable, *repo_failed], key=lambda entry: entry[1].number
+                ):
+                    rows.append((repo_name, pr, report.find_pr(pr)))
+                if repo_mergeable:
+                    merges.append(merger.submit(process_mergeable_prs, console, opts, repo_mergeable, report))
+            live.update(render_pipeline(rows, scanned))
+
+        while wait(merges, timeout=0.1).not_done:
+            live.update(render_pipeline(rows, len(REPOSITORIES)))
+        live.update(render_pipeline(rows, len(REPOSITORIES)))
+
+    for merge in merges:
+        merge.result()
     return mergeable_prs, failed_prs
 
 
 def scan_single_repository(
-    token: str, repo_path: str
-) -> tuple[list[tuple[str, PullRequest, str]], list[tuple[str, PullRequest, str]], list[str], str]:
+    token: str, repo_path: str, record: RepoRecord, api_url: str
+) -> tuple[list[tuple[str, PullRequest, str]], list[tuple[str, PullRequest, str]], str]:
     """Scan a single repository for PRs. Uses a per-thread client (PyGithub sessions aren't shared-safe)."""
-    repo = Github(auth=Token(token)).get_repo(repo_path)
-    repo_name = repo.name
-    prs = repo.get_pulls(state="open", sort="created", direction="asc")
-
-    mergeable_prs: list[tuple[str, PullRequest, str]] = []
-    failed_prs: list[tuple[str, PullRequest, str]] = []
-    pr_titles: list[str] = []
-
-    for pr in prs:
-        if pr.draft:
-            continue
-        if (user := pr.user) is None or user.type != "Bot" or user.login not in BOT_AUTHORS:
-            continue
-
-        check_status, reason, checked_sha = check_pr_status(pr)
-        if check_status == "success":
-            assert checked_sha is not None
-            mergeable_prs.append((repo_name, pr, checked_sha))
-        else:
-            failed_prs.append((repo_name, pr, reason))
-
-        pr_titles.append(f"#{pr.number} {pr.title}")
-
-    return mergeable_prs, failed_prs, pr_titles, repo_name
-
-
-def display_mergeable_prs(console: Console, mergeable_prs: list[tuple[str, PullRequest, str]]) -> None:
-    """Display table of PRs that can be auto-merged."""
-    console.print("[bold green]✅ Mergeable PRs (all checks passing):[/bold green]")
-    table = Table(show_header=True)
-    table.add_column("Repository", style="cyan")
-    table.add_column("PR #", style="magenta")
-    table.add_column("Title", style="yellow")
-    table.add_column("Author", style="blue")
-
-    for repo_name, pr, _checked_sha in mergeable_prs:
-        table.add_row(repo_name, f"#{pr.number}", pr.title, pr.user.login if pr.user else "unknown")
-
-    console.print(table)
-    console.print()
-
-
-def process_mergeable_prs(console: Console, opts: Options, mergeable_prs: list[tuple[str, PullRequest, str]]) -> None:
+    started = time.monotonic()
+    try:
+        with record.calls.timed("repo"):
+            repo = Github(base_url=api_url, auth=Token(token)).get_repo(repo_path)
+        repo_name, record.full_name = repo.name, repo.full_name
+        # get_pulls is lazy: the list calls happen while iterating, so time the materialization instead.
+        with record.calls.timed("list"):
+            prs = list(repo.get_pulls(state="open", sort="created", direction="asc"))
+
+        mergeable_prs: list[tuple[str, PullRequest, str]] = []
+        failed_prs: list[tuple[str, PullRequest, str]] = []
+
+        for pr in prs:
+            if pr.draft:
+                continue
+            if (user := pr.user) is None or user.type != "Bot" or user.login not in BOT_AUTHORS:
+                continue
+
+            pr_record = record.pr(pr.number, pr.title)
+            pr_started = time.monotonic()
+            check_status, reason, checked_sha = check_pr_status(pr, pr_record)
+            pr_record.wall_time = time.monotonic() - pr_started
+            if check_status == "success":
+                assert checked_sha is not None
+                pr_record.verdict = "mergeable"
+                mergeable_prs.append((repo_name, pr, checked_sha))
+            else:
+                pr_record.verdict, pr_record.reason = "failed", reason
+                failed_prs.append((repo_name, pr, reason))
+    finally:
+        record.wall_time = time.monotonic() - started
+
+    return mergeable_prs, failed_prs, repo_name
+
+
+def process_mergeable_prs(
+    console: Console, opts: Options, mergeable_prs: list[tuple[str, PullRequest, str]], report: RunReport
+) -> None:
     """Approve and merge PRs or show what would be done in dry-run mode."""
     for repo_name, pr, checked_sha in mergeable_prs:
         if opts.dry_run:
             console.print(f"[dim][DRY RUN] Would approve and merge {repo_name}#{pr.number}[/dim]")
         else:
-            approve_and_merge(console, repo_name, pr, checked_sha)
+            approve_and_merge(console, repo_name, pr, checked_sha, report.find_pr(pr))
 
 
-def display_failed_prs(console: Console, failed_prs: list[tuple[str, PullRequest, str]]) -> None:
-    """Display table of PRs that need manual review."""
-    console.print("[bold yellow]⚠️  PRs requiring manual review:[/bold yellow]")
-    table = Table(show_header=True)
+def render_pipeline(rows: list[tuple[str, PullRequest, PrRecord]], scanned: int) -> Table:
+    """Render every PR found so far with its current stage; redrawn as repos finish and merges progress."""
+    table = Table(title=f"Scanned {scanned}/{len(REPOSITORIES)} repositories", show_header=True)
     table.add_column("Repository", style="cyan")
     table.add_column("PR #", style="magenta")
     table.add_column("Title", style="yellow")
-    table.add_column("Reason", style="red")
-
-    for repo_name, pr, reason in failed_prs:
-        table.add_row(repo_name, f"#{pr.number}", pr.title, reason)
-
-    console.print(table)
-    console.print()
-
-
-def open_failed_prs(console: Console, failed_prs: list[tuple[str, PullRequest, str]]) -> None:
-    """Open PRs that need manual review in browser."""
-    console.print("[bold]Opening failed PRs in browser...[/bold]")
-    for repo_name, pr, _reason in failed_prs:
-        console.print(f"[dim]Opening {repo_name}#{pr.number}...[/dim]")
-        webbrowser.open(pr.html_url)
+    table.add_column("Author", style="blue")
+    table.add_column("Status")
+
+    for repo_name, pr, record in rows:
+        status = f"[{VERDICT_STYLE.get(record.verdict, '')}]{record.verdict}[/]"
+        if record.reason:
+            status += f" [dim]({escape(record.reason)})[/dim]"
+        table.add_row(repo_name, f"#{pr.number}", escape(pr.title), pr.user.login if pr.user else "unknown", status)
+    return table
+
+
+def open_failed_prs(console: Console, failed_prs: list[tuple[str, PullRequest, str]], report: RunReport) -> None:
+    """Open one dashboard of the PRs that need manual review instead of a browser tab per PR."""
+    # A fresh, private file per run: a fixed name in the shared temp directory could be planted or symlinked by
+    # another user, and concurrent runs would overwrite each other's dashboard.
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", prefix="maintainer-failed-prs-", suffix=".html", delete=False
+    ) as handle:
+        handle.write(render_dashboard(failed_prs, report))
+    path = Path(handle.name)
+    console.print(f"[bold]Opening dashboard of {len(failed_prs)} failed PRs ({path})...[/bold]")
+    webbrowser.open(path.as_uri())
+
+
+def render_dashboard(failed_prs: list[tuple[str, PullRequest, str]], report: RunReport) -> str:
+    """Render failed PRs as a standalone HTML page, grouped by repository and then by failure kind."""
+    grouped: dict[str, dict[str, list[tuple[PullRequest, str]]]] = {}
+    for repo_name, pr, reason in sorted(failed_prs, key=lambda entry: (entry[0], entry[1].number)):
+        grouped.setdefault(repo_name, {}).setdefault(failure_kind(reason), []).append((pr, reason))
+
+    sections: list[str] = []
+    for repo_name, by_kind in grouped.items():
+        sections.append(f"<h2>{html.escape(repo_name)}</h2>")
+        for kind, entries in sorted(by_kind.items()):
+            sections.append(f"<h3>{html.escape(kind)}</h3><ul>")
+            for pr, reason in entries:
+                checks = "".join(render_failed_check(check) for check in report.find_pr(pr).failed_checks)
+                sections.append(
+                    f'<li><a href="{html.escape(pr.html_url)}">#{pr.number} {html.escape(pr.title)}</a>'
+                    f" <span class=reason>{html.escape(reason)}</span><ul>{checks}</ul></li>"
+                )
+            sections.append("</ul>")
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>PRs requiring manual review</title>
+<style>
+body {{ font-family: system-ui, sans-serif; margin: 2em; }}
+.reason {{ color: #b00; }}
+pre {{ background: #f4f4f4; padding: 0.5em; max-height: 30em; overflow: auto; white-space: pre-wrap; }}
+</style></head>
+<body><h1>{len(failed_prs)} PRs requiring manual review</h1>
+{"".join(sections)}
+</body></html>
+"""
+
+
+def failure_kind(reason: str) -> str:
+    """The fixed leading part of a reason, e.g. "Not mergeable" or "Check failed", without the names and values."""
+    return reason.partition(":")[0].partition(" (")[0]
+
+
+def render_failed_check(check: FailedCheck) -> str:
+    name = html.escape(check.name)
+    link = f'<a href="{html.escape(check.url)}">{name}</a>' if check.url else name
+    # The check-run payload already carries its output, so showing it here costs no extra request.
+    output = (
+        f"<details><summary>output</summary><pre>{html.escape(check.output)}</pre></details>" if check.output else ""
+    )
+    return f"<li>{link} ({html.escape(check.state)}){output}</li>"
 
 
-def check_pr_status(pr: PullRequest) -> tuple[str, str, str | None]:  # noqa: PLR0911
+def check_pr_status(pr: PullRequest, record: PrRecord) -> tuple[str, str, str | None]:
     """
     Check if a PR is ready to merge.
 
@@ -263,57 +399,430 @@ def check_pr_status(pr: PullRequest) -> tuple[str, str, str | None]:  # noqa: PL
     - "success": All checks passed, ready to merge
     - "failed": Some checks failed or other issues
 
-    The reason provides details when status is "failed".
+    The reason provides details when status is "failed"; every failing check is also kept on the record.
     """
+    calls = record.calls
     # mergeable is True/False/None; None means GitHub hasn't computed it yet, so don't act on stale data.
-    if pr.mergeable is not True or pr.mergeable_state in ("unknown", "dirty"):
-        return "failed", f"Not mergeable (mergeable={pr.mergeable}, state={pr.mergeable_state})", None
+    # Listed PRs lack mergeability, so the first access lazily fetches the full PR.
+    with calls.timed("pull"):
+        mergeable = pr.mergeable
+    if mergeable is not True or pr.mergeable_state in ("unknown", "dirty"):
+        return "failed", f"Not mergeable (mergeable={mergeable}, state={pr.mergeable_state})", None
 
     # Evaluate CI on the true head commit, not get_commits()[-1] (truncated past 250 commits).
-    head_commit = pr.base.repo.get_commit(pr.head.sha)
-    combined_status = head_commit.get_combined_status()
-    check_runs = head_commit.get_check_runs()
-
-    legacy_statuses = combined_status.statuses
-    check_run_list = list(check_runs)
+    with calls.timed("commit"):
+        head_commit = pr.base.repo.get_commit(pr.head.sha)
+    with calls.timed("status"):
+        legacy_statuses = head_commit.get_combined_status().statuses
+    with calls.timed("check-runs"):
+        check_run_list = list(head_commit.get_check_runs())
 
     if not legacy_statuses and not check_run_list:
         return "failed", "No CI checks found", None
 
-    for status in legacy_statuses:
-        if status.state in ("error", "failure"):
-            return "failed", f"Check failed: {status.context}", None
-        if status.state == "pending":
-            return "failed", f"Check pending: {status.context}", None
-
-    for check_run in check_run_list:
-        if check_run.status != "completed":
-            return "failed", f"Check not completed: {check_run.name}", None
-        if check_run.conclusion not in ("success", "neutral", "skipped"):
-            return "failed", f"Check failed: {check_run.name} ({check_run.conclusion})", None
+    # Both lists are already fetched, so collect every failure rather than stopping at the first one.
+    record.failed_checks = [
+        *(failure for status in legacy_statuses if (failure := failed_status(status))),
+        *(failure for check_run in check_run_list if (failure := failed_check_run(check_run))),
+    ]
+    if record.failed_checks:
+        return "failed", record.failed_checks[0].reason, None
 
     return "success", "", pr.head.sha
 
 
-def approve_and_merge(console: Console, repo_name: str, pr: PullRequest, checked_sha: str) -> None:
+def failed_status(status: CommitStatus) -> FailedCheck | None:
+    if status.state in ("error", "failure"):
+        reason = f"Check failed: {status.context}"
+    elif status.state == "pending":
+        reason = f"Check pending: {status.context}"
+    else:
+        return None
+    return FailedCheck(status.context, status.state, reason, status.target_url or "", status.description or "")
+
+
+def failed_check_run(check_run: CheckRun) -> FailedCheck | None:
+    if check_run.status != "completed":
+        state, reason = check_run.status, f"Check not completed: {check_run.name}"
+    elif check_run.conclusion not in ("success", "neutral", "skipped"):
+        state, reason = check_run.conclusion, f"Check failed: {check_run.name} ({check_run.conclusion})"
+    else:
+        return None
+    output = check_run.output
+    text = "\n\n".join(part for part in (output.title, output.summary, output.text) if part)
+    return FailedCheck(check_run.name, state or "", reason, check_run.html_url or "", text)
+
+
+def approve_and_merge(console: Console, repo_name: str, pr: PullRequest, checked_sha: str, record: PrRecord) -> None:
     """Approve a PR with LGTM comment and merge it."""
+    started = time.monotonic()
     try:
         pr_link = f"[link={pr.html_url}]{repo_name}#{pr.number}[/link]"
 
-        console.print(f"[green]✓ Approving {pr_link}...[/green]")
-        pr.create_review(body="LGTM", event="APPROVE")
+        record.verdict = "approving"
+        with record.calls.timed("review"):
+            pr.create_review(body="LGTM", event="APPROVE")
 
-        console.print(f"[green]✓ Merging {pr_link}...[/green]")
-        merge_result = pr.merge(sha=checked_sha, merge_method="squash")
+        record.verdict = "merging"
+        with record.calls.timed("merge"):
+            merge_result = pr.merge(sha=checked_sha, merge_method="squash")
 
         if merge_result.merged:
+            record.verdict = "merged"
             console.print(f"[bold green]✅ Successfully merged {pr_link}![/bold green]")
         else:
-            console.print(f"[yellow]⚠ Could not merge {pr_link}: {merge_result.message}[/yellow]")
+            record.verdict, record.reason = "merge-failed", merge_result.message
+            console.print(f"[yellow]⚠ Could not merge {pr_link}: {escape(merge_result.message)}[/yellow]")
 
     except GithubException as e:
+        record.verdict, record.reason = "merge-failed", str(e)
         pr_link = f"[link={pr.html_url}]{repo_name}#{pr.number}[/link]"
-        console.print(f"[red]❌ Failed to approve/merge {pr_link}: {e}[/red]")
+        console.print(f"[red]❌ Failed to approve/merge {pr_link}: {escape(str(e))}[/red]")
+    finally:
+        record.wall_time += time.monotonic() - started
+
+
+def write_report(console: Console, report: RunReport, target: str) -> None:
+    """Write the run report as NDJSON to a file, or to stdout for '-'."""
+    lines = "".join(f"{json.dumps(record)}\n" for record in report.records())
+    if target == "-":
+        sys.stdout.write(lines)
+        return
+    try:
+        Path(target).write_text(lines, encoding="utf-8")
+    except OSError as exc:
+        console.print(f"[red]Could not write report to {target}: {exc}[/red]")
+
+
+def display_latency_summary(console: Console, report: RunReport) -> None:
+    """Display API call counts and p50/p95 latency per call type across the whole run."""
+    table = Table(title=f"API latency ({report.api_calls} calls, {report.wall_time:.1f}s wall)", show_header=True)
+    table.add_column("Call", style="cyan")
+    table.add_column("Count", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("Total", justify="right")
+    for kind, stats in summarize_latencies(report.latencies()).items():
+        table.add_row(
+            kind, str(stats["count"]), f"{stats['p50']:.3f}s", f"{stats['p95']:.3f}s", f"{stats['total']:.1f}s"
+        )
+    console.print(table)
+
+
+def summarize_latencies(latencies: dict[str, list[float]]) -> dict[str, dict[str, Any]]:
+    return {
+        kind: {
+            "count": len(values),
+            "p50": round(percentile(values, 50), 4),
+            "p95": round(percentile(values, 95), 4),
+            "total": round(sum(values), 4),
+        }
+        for kind, values in sorted(latencies.items())
+        if values
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    # Nearest-rank: with a handful of samples per call type, interpolation would invent latencies never observed.
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+@dataclass
+class CallLog:
+    """Latency of every GitHub API call, grouped by call type (list, pull, commit, status, ...)."""
+
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+
+    @contextmanager
+    def timed(self, kind: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.latencies.setdefault(kind, []).append(time.monotonic() - started)
+
+    @property
+    def api_calls(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "api_calls": self.api_calls,
+            "latency": {kind: [round(value, 4) for value in values] for kind, values in self.latencies.items()},
+        }
+
+
+@dataclass
+class FailedCheck:
+    name: str
+    state: str
+    reason: str
+    url: str
+    output: str
+
+
+@dataclass
+class PrRecord:
+    number: int
+    title: str
+    verdict: str = ""
+    reason: str = ""
+    wall_time: float = 0.0
+    calls: CallLog = field(default_factory=CallLog)
+    failed_checks: list[FailedCheck] = field(default_factory=list)
+
+
+@dataclass
+class RepoRecord:
+    path: str
+    full_name: str = ""
+    error: str = ""
+    wall_time: float = 0.0
+    calls: CallLog = field(default_factory=CallLog)
+    prs: dict[int, PrRecord] = field(default_factory=dict)
+
+    def pr(self, number: int, title: str) -> PrRecord:
+        return self.prs.setdefault(number, PrRecord(number, title))
+
+
+@dataclass
+class RunReport:
+    """Per-run telemetry; each repo record is only written by the thread scanning that repo."""
+
+    started: float = field(default_factory=time.monotonic)
+    wall_time: float = 0.0
+    repos: dict[str, RepoRecord] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        # Pre-create every record so worker threads never mutate the shared dict.
+        for repo_path in REPOSITORIES:
+            self.repos[repo_path] = RepoRecord(repo_path)
+
+    def repo(self, repo_path: str) -> RepoRecord:
+        return self.repos[repo_path]
+
+    def find_pr(self, pr: PullRequest) -> PrRecord:
+        # Match on the API's full name: a configured path may differ in case or point at a renamed repo.
+        repo = next(record for record in self.repos.values() if record.full_name == pr.base.repo.full_name)
+        return repo.pr(pr.number, pr.title)
+
+    def finish(self) -> None:
+        self.wall_time = time.monotonic() - self.started
+
+    @property
+    def api_calls(self) -> int:
+        return sum(
+            repo.calls.api_calls + sum(pr.calls.api_calls for pr in repo.prs.values()) for repo in self.repos.values()
+        )
+
+    def latencies(self) -> dict[str, list[float]]:
+        merged: dict[str, list[float]] = {}
+        for repo in self.repos.values():
+            for calls in (repo.calls, *(pr.calls for pr in repo.prs.values())):
+                for kind, values in calls.latencies.items():
+                    merged.setdefault(kind, []).extend(values)
+        return merged
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        for repo in self.repos.values():
+            yield {
+                "type": "repo",
+                "repo": repo.path,
+                "prs": len(repo.prs),
+                "error": repo.error,
+                "wall_time": round(repo.wall_time, 4),
+                **repo.calls.as_dict(),
+            }
+            for pr in repo.prs.values():
+                yield {
+                    "type": "pr",
+                    "repo": repo.path,
+                    "number": pr.number,
+                    "title": pr.title,
+                    "verdict": pr.verdict,
+                    "reason": pr.reason,
+                    "failed_checks": [{"name": check.name, "url": check.url} for check in pr.failed_checks],
+                    "wall_time": round(pr.wall_time, 4),
+                    **pr.calls.as_dict(),
+                }
+        yield {
+            "type": "run",
+            "repos": len(self.repos),
+            "api_calls": self.api_calls,
+            "wall_time": round(self.wall_time, 4),
+            "latency": summarize_latencies(self.latencies()),
+        }
+
+
+@contextmanager
+def api_endpoint(console: Console, opts: Options) -> Iterator[str]:
+    """Yield the GitHub API base URL, recording the run to or replaying it from a cassette when asked."""
+    if opts.replay:
+        cassette = Cassette.load(Path(opts.replay))
+        with ReplayServer(cassette, latency=opts.replay_latency / 1000, rate_limit=opts.replay_rate_limit) as server:
+            console.print(
+                f"[dim]Replaying {len(cassette.exchanges)} exchanges from {opts.replay} at {server.url}[/dim]"
+            )
+            yield server.url
+    elif opts.record:
+        cassette = Cassette()
+        RecordingConnection.cassette = cassette
+        # PyGithub builds its connections itself; swapping the class is its supported interception point.
+        Requester.injectConnectionClasses(HTTPRequestsConnectionClass, RecordingConnection)
+        try:
+            yield DEFAULT_BASE_URL
+        finally:
+            Requester.resetConnectionClasses()
+            cassette.save(Path(opts.record))
+            console.print(f"[dim]Recorded {len(cassette.exchanges)} exchanges to {opts.record}[/dim]")
+    else:
+        yield DEFAULT_BASE_URL
+
+
+@dataclass
+class Exchange:
+    method: str
+    path: str
+    body: str | None
+    status: int
+    headers: dict[str, str]
+    response: str
+
+
+@dataclass
+class Cassette:
+    """HTTP exchanges of one run, in request order; stored as NDJSON so recordings diff line by line."""
+
+    exchanges: list[Exchange] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, exchange: Exchange) -> None:
+        with self.lock:
+            self.exchanges.append(exchange)
+
+    def save(self, path: Path) -> None:
+        path.write_text("".join(f"{json.dumps(asdict(exchange))}\n" for exchange in self.exchanges), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> Cassette:
+        lines = path.read_text(encoding="utf-8").splitlines()
+        return cls([Exchange(**json.loads(line)) for line in lines if line.strip()])
+
+
+class RecordingConnection(HTTPSRequestsConnectionClass):
+    """HTTPS connection that copies every exchange into the active cassette; request headers (auth) are dropped."""
+
+    cassette: ClassVar[Cassette]
+
+    def getresponse(self) -> RequestsResponse:
+        response = super().getresponse()
+        headers = {
+            key.lower(): value for key, value in response.getheaders() if key.lower() not in UNREPLAYABLE_HEADERS
+        }
+        body = self.input if isinstance(self.input, str) else None
+        self.cassette.add(Exchange(self.verb, self.url, body, response.status, headers, response.read()))
+        return response
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Local stand-in for api.github.com that serves a cassette.
+
+    Exchanges are matched on method and path and served in recorded order; once a path runs out, its last
+    response is repeated so a strategy making more calls than the recording still completes. An optional
+    per-minute request budget is reported via the x-ratelimit-* headers and enforced with a 403, as GitHub does.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, cassette: Cassette, *, latency: float, rate_limit: int) -> None:
+        super().__init__(("127.0.0.1", 0), ReplayHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset_at = time.time() + 60
+        self.lock = threading.Lock()
+        self.responses: defaultdict[tuple[str, str], deque[Exchange]] = defaultdict(deque)
+        for exchange in cassette.exchanges:
+            self.responses[exchange.method, exchange.path].append(exchange)
+
+    def __enter__(self) -> Self:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.shutdown()
+        super().__exit__(exc_type, exc_value, traceback)
+
+    def next_exchange(self, method: str, path: str) -> Exchange | None:
+        with self.lock:
+            if not (queue := self.responses.get((method, path))):
+                return None
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def consume_rate_limit(self) -> tuple[bool, dict[str, str]]:
+        """Spend one request from the budget; returns whether it was exhausted and the headers to report."""
+        if not self.rate_limit:
+            return False, {}
+        with self.lock:
+            if (now := time.time()) >= self.reset_at:
+                self.remaining, self.reset_at = self.rate_limit, now + 60
+            exhausted = self.remaining <= 0
+            self.remaining = max(self.remaining - 1, 0)
+            return exhausted, {
+                "x-ratelimit-limit": str(self.rate_limit),
+                "x-ratelimit-remaining": str(self.remaining),
+                "x-ratelimit-used": str(self.rate_limit - self.remaining),
+                "x-ratelimit-reset": str(int(self.reset_at)),
+            }
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.replay()
+
+    def do_POST(self) -> None:
+        self.replay()
+
+    def do_PUT(self) -> None:
+        self.replay()
+
+    def do_PATCH(self) -> None:
+        self.replay()
+
+    def do_DELETE(self) -> None:
+        self.replay()
+
+    def replay(self) -> None:
+        if length := int(self.headers.get("content-length", 0)):
+            self.rfile.read(length)
+        time.sleep(self.server.latency)
+        exhausted, rate_headers = self.server.consume_rate_limit()
+        if exhausted:
+            status, headers, body = 403, {}, json.dumps({"message": "API rate limit exceeded (replay)"})
+        elif (exchange := self.server.next_exchange(self.command, self.path)) is None:
+            status, headers, body = 404, {}, json.dumps({"message": f"Not in cassette: {self.command} {self.path}"})
+        else:
+            # Point pagination links and lazily completed object URLs back at this server.
+            status, body = exchange.status, exchange.response.replace(DEFAULT_BASE_URL, self.server.url)
+            headers = {key: value.replace(DEFAULT_BASE_URL, self.server.url) for key, value in exchange.headers.items()}
+        payload = body.encode()
+        self.send_response(status)
+        for key, value in {"content-type": "application/json", **headers, **rate_headers}.items():
+            self.send_header(key, value)
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
 
 
 if __name__ == "__main__":
@@ -1,7 +1,9 @@
 # /// script
 # requires-python = ">=3.14"
 # dependencies = [
+#     "httpx>=0.28.1",
 #     "rich>=14.2",
+#     "truststore>=0.10.4",
 # ]
 # ///
 """Update registry-sourced Docker images to their latest digest; prune dormant local ones.
@@ -10,42 +12,115 @@ Classification is by reference: an image whose repo carries a registry host (the
 before the first "/" contains "." or ":", or is localhost) is registry-backed; anything
 else is a local build, including ones carrying a hostless RepoDigest from a mirror push.
 Inspection is keyed by image id, which always resolves — inspecting by tag intermittently
-reports "no such object". Registry images are always kept and refreshed via `crane digest`
-(daemon-free, reuses docker credentials); only those whose digest moved are pulled. Local
-images are pruned only once dormant for two weeks — by container last-run time, falling back
-to build time when no run was recorded. The table flags a platform differing from the host arch.
+reports "no such object". Registry images are always kept and refreshed by a manifest HEAD
+(`crane digest` as the fallback); only those whose digest moved for their own platform are
+pulled. Local images are pruned only once dormant for two weeks — by container last-run time,
+falling back to build time when no run was recorded. The table flags a platform differing from
+the host arch.
 """
 
 from __future__ import annotations
 
+import base64
+import dataclasses
+import hashlib
 import json
+import math
 import os
 import platform
 import pty
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, field
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
 from datetime import UTC, datetime, timedelta
-from typing import Final
+from fnmatch import fnmatchcase
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from typing import TYPE_CHECKING, Any, Final, Protocol, Self, cast
+from urllib.parse import quote, urljoin
 
+import httpx
 from rich import box
 from rich.console import Console
 from rich.live import Live
+from rich.markup import escape
 from rich.table import Table
+from truststore import inject_into_ssl
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from types import TracebackType
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    concurrency: int
+    rate: float
+
 
 _CONSOLE: Final[Console] = Console()
+_CACHE_DIR: Final[Path] = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "update_docker_images"
 _STALE_LOCAL_AGE: Final[timedelta] = timedelta(days=14)
 _OLDEST: Final[datetime] = datetime.min.replace(tzinfo=UTC)
 _HOST_ARCH: Final[str] = {"x86_64": "amd64", "aarch64": "arm64"}.get(platform.machine(), platform.machine())
 _DOWNLOAD_RE: Final[re.Pattern[str]] = re.compile(
     r"([0-9a-f]{6,}): Downloading\s+\[[^\]]*\]\s+[0-9.]+[A-Za-z]+/([0-9.]+[A-Za-z]+)"
 )
+_MANIFEST_TYPES: Final[str] = (
+    "application/vnd.oci.image.index.v1+json, application/vnd.docker.distribution.manifest.list.v2+json, "
+    "application/vnd.oci.image.manifest.v1+json, application/vnd.docker.distribution.manifest.v2+json"
+)
+_DOCKER_HUB: Final[str] = "registry-1.docker.io"
+_DOCKER_HUB_AUTH_KEY: Final[str] = "https://index.docker.io/v1/"
+# The username credential helpers report for an identity (OAuth refresh) token rather than a password.
+_IDENTITY_TOKEN: Final[str] = "<token>"
+_DEFAULT_LIMIT: Final[HostLimit] = HostLimit(concurrency=8, rate=20.0)
+# Docker Hub rate-limits by source IP, anonymous callers hardest; stay well below its abuse threshold.
+_REGISTRY_LIMITS: Final[dict[str, HostLimit]] = {_DOCKER_HUB: HostLimit(concurrency=3, rate=2.0)}
+_MAX_RETRIES: Final[int] = 5
+_RATE_LIMITED: Final[str] = "rate limited"
+_IN_USE: Final[str] = "in use"
+# Container starts, plus the image events after which a name may resolve to a different id.
+_START_FILTERS: Final[dict[str, list[str]]] = {
+    "type": ["container", "image"],
+    "event": ["start", "pull", "tag", "untag", "delete", "load", "import"],
+}
+# Above this many images the live view collapses to per-state counts plus the pulls in flight.
+_COMPACT_ROWS: Final[int] = 40
+_MIN_REDRAW: Final[float] = 0.1
+_MAX_REDRAW: Final[float] = 1.0
+_MOVING_TAGS: Final[frozenset[str]] = frozenset({
+    "latest",
+    "main",
+    "master",
+    "edge",
+    "nightly",
+    "dev",
+    "develop",
+    "stable",
+    "rolling",
+})
+_PINNED_TAG_RE: Final[re.Pattern[str]] = re.compile(r"v?\d+\.\d+\.\d+(?:[-+_.].*)?")
+_MOVING_INTERVAL: Final[timedelta] = timedelta(hours=1)
+_FLOATING_INTERVAL: Final[timedelta] = timedelta(days=1)
+_PINNED_INTERVAL: Final[timedelta] = timedelta(days=7)
+_CHECK_STATE_RETENTION: Final[timedelta] = timedelta(days=30)
+# Share of an interval a reference may be checked early by, so cron jitter does not push it a whole run back.
+_CHECK_SLACK: Final[float] = 0.05
 _SIZE_UNITS: Final[dict[str, int]] = {"b": 1, "kb": 1000, "mb": 1000**2, "gb": 1000**3, "tb": 1000**4}
 _STATE_STYLE: Final[dict[str, str]] = {
     "checking": "dim",
+    "queued": "dim",
+    "mirroring": "cyan",
     "pulling": "yellow",
     "up to date": "blue",
     "updated": "green",
@@ -55,36 +130,270 @@ _STATE_STYLE: Final[dict[str, str]] = {
 
 
 def main() -> None:
-    registry, stale_local = scan_images()
-    if registry:
-        update_registry_images(registry)
+    opts = parse_cli()
+    if "-" in {opts.json, opts.ndjson}:
+        # The results own stdout; tables and progress move to stderr so the document stays parseable.
+        _CONSOLE.stderr = True
+    inject_into_ssl()
+    credentials = DockerCredentials.load()
+    with ExitStack() as stack:
+        # An empty label is the daemon the environment points at; fleet members are labelled by their target.
+        daemons = {
+            target: stack.enter_context(connect_daemon(credentials, force_cli=opts.cli, target=target))
+            for target in opts.daemon or [""]
+        }
+        if opts.listen:
+            listen_for_starts(daemons)
+        else:
+            update_fleet(credentials, daemons, opts)
+
+
+def update_fleet(credentials: DockerCredentials, daemons: dict[str, Daemon], opts: Options) -> None:
+    """
+    Run the whole pipeline across every daemon at once.
+
+    Each reference is checked against its registry once however many daemons hold it, and every daemon plans
+    and runs its own pulls, so a fleet refresh costs about as much as its largest member.
+    """
+    scans, failed = scan_fleet(daemons)
+    # An unreachable fleet member is left out of this run; the others are still updated and tidied.
+    daemons = {label: daemon for label, daemon in daemons.items() if label in scans}
+    wall_time = 0.0
+    if registry := [status for images, _stale in scans.values() for status in images]:
+        state = CheckState.load(_CACHE_DIR / "check-state.json") if opts.incremental else None
+        due = state.select(registry, opts.check_interval) if state else registry
+        # The schedule decides when a due reference is asked for, so a cached digest must not answer for it.
+        cache = DigestCache.load(_CACHE_DIR / "digests.json", timedelta(hours=0 if state else opts.digest_ttl))
+        limits = RegistryLimits(_REGISTRY_LIMITS | dict(opts.registry_limit))
+        started = time.monotonic()
+        with RegistryClient(credentials, limits) as client:
+            if due:
+                update_registry_images(due, DigestLookups(cache, client), client, daemons, opts)
+        wall_time = time.monotonic() - started
+        cache.save()
+        if state:
+            state.record(due)
+            state.save()
+            report_deferred(registry)
+        report_rate_limits(limits)
     else:
         _CONSOLE.print("No registry-backed images to check.")
-    cleanup_local(stale_local)
-    prune_system()
-
-
-def scan_images() -> tuple[list[ImageStatus], list[str]]:
-    listing: subprocess.CompletedProcess[str] = subprocess.run(
-        [
-            "docker",
-            "images",
-            "--digests",
-            "--no-trunc",
-            "--format",
-            "{{.Repository}}:{{.Tag}}\t{{.ID}}\t{{.Digest}}\t{{.Size}}",
-        ],
-        check=False,
-        capture_output=True,
-        text=True,
+    # Written even for an empty run, so a consumer always finds a document to read.
+    if opts.json:
+        write_output(json.dumps(run_document(registry, wall_time, failed), indent=1) + "\n", opts.json)
+    if opts.ndjson:
+        records = run_records(registry, wall_time, failed)
+        write_output("".join(f"{json.dumps(record)}\n" for record in records), opts.ndjson)
+    tidy_fleet(daemons, scans, opts.free_space)
+    if failed:
+        names = escape(", ".join(label or "local daemon" for label in failed))
+        _CONSOLE.print(f"[red]Skipped {len(failed)} of {len(failed) + len(daemons)} daemon(s) that failed: {names}[/]")
+
+
+def scan_fleet(
+    daemons: dict[str, Daemon],
+) -> tuple[dict[str, tuple[list[ImageStatus], list[str]]], dict[str, str]]:
+    """Scan every daemon at once; return the scans that worked and why the others did not."""
+    with ThreadPoolExecutor(max_workers=len(daemons)) as executor:
+        pending = {label: executor.submit(scan_images, daemon, label) for label, daemon in daemons.items()}
+    scans: dict[str, tuple[list[ImageStatus], list[str]]] = {}
+    failed: dict[str, str] = {}
+    for label, future in pending.items():
+        try:
+            scans[label] = future.result()
+        except Exception as exc:  # noqa: BLE001
+            failed[label] = short_error(str(exc), 120)
+            _CONSOLE.print(f"[red]{label or 'local daemon'}: scan failed: {escape(failed[label])}[/]")
+    return scans, failed
+
+
+def tidy_fleet(
+    daemons: dict[str, Daemon], scans: dict[str, tuple[list[ImageStatus], list[str]]], free_space: int
+) -> None:
+    if not daemons:
+        return
+    with ThreadPoolExecutor(max_workers=len(daemons)) as executor:
+        tidies: dict[str, Future[None]] = {}
+        for label, daemon in daemons.items():
+            images, stale_local = scans[label]
+            registry_refs = {status.image for status in images}
+            tidies[label] = executor.submit(tidy_daemon, daemon, stale_local, registry_refs, label, free_space)
+    for label, future in tidies.items():
+        # One daemon failing to tidy must neither hide its error nor stop the others.
+        try:
+            future.result()
+        except Exception as exc:  # noqa: BLE001
+            _CONSOLE.print(f"[red]{label or 'local daemon'}: cleanup failed: {escape(short_error(str(exc), 120))}[/]")
+
+
+class Options(Namespace):
+    digest_ttl: float
+    registry_limit: list[tuple[str, HostLimit]]
+    pull_budget: int
+    pull_workers: int
+    cli: bool
+    daemon: list[str]
+    free_space: int
+    listen: bool
+    json: str | None
+    ndjson: str | None
+    mirror: str | None
+    mirror_workers: int
+    incremental: bool
+    check_interval: list[tuple[str, timedelta]]
+
+
+def parse_cli() -> Options:
+    parser = ArgumentParser(description="Refresh registry-backed Docker images and prune dormant local ones.")
+    parser.add_argument(
+        "--digest-ttl",
+        type=float,
+        default=6.0,
+        metavar="HOURS",
+        help="Trust a cached remote digest for this long before asking the registry again; 0 disables (default: 6)",
     )
-    rows: list[list[str]] = [
-        parts
-        for raw_line in listing.stdout.splitlines()
-        if len(parts := raw_line.split("\t")) == 4 and "<none>" not in parts[0]
-    ]
-    inspected = bulk_inspect([row[1] for row in rows])
-    runs = last_run_times()
+    parser.add_argument(
+        "--registry-limit",
+        type=parse_host_limit,
+        action="append",
+        default=[],
+        metavar="HOST=N[:RATE]",
+        help="Run at most N images and RATE registry requests per second against HOST (repeatable)",
+    )
+    parser.add_argument(
+        "--pull-budget",
+        type=size_arg,
+        default=parse_size("4GB"),
+        metavar="SIZE",
+        help="Cap on expected download bytes of pulls running at once; one pull always runs (default: 4GB)",
+    )
+    parser.add_argument(
+        "--pull-workers", type=positive_int, default=4, metavar="N", help="Maximum concurrent pulls (default: 4)"
+    )
+    parser.add_argument(
+        "--cli", action="store_true", help="Drive the daemon through the docker CLI instead of its API socket"
+    )
+    parser.add_argument(
+        "--daemon",
+        action="append",
+        default=[],
+        metavar="TARGET",
+        help="Docker context name or DOCKER_HOST URL (ssh://, tcp://, unix://); repeat to update a fleet at once",
+    )
+    parser.add_argument(
+        "--free-space",
+        type=size_arg,
+        default=0,
+        metavar="SIZE",
+        help="Remove least-recently-used unused images until the daemon's disk has SIZE free, instead of the "
+        "14-day dormancy rule",
+    )
+    parser.add_argument(
+        "--listen",
+        action="store_true",
+        help="Record container starts from every daemon's event stream until interrupted, so later runs see "
+        "images used only by --rm containers",
+    )
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Write per-image timings and per-registry throughput as one JSON document to PATH, or '-' for stdout",
+    )
+    parser.add_argument(
+        "--ndjson",
+        metavar="PATH",
+        help="Write the same results as NDJSON (one record per image, per registry and per run) to PATH, or '-'",
+    )
+    parser.add_argument(
+        "--mirror",
+        metavar="HOST[:PORT]",
+        help="Copy each update into this registry (the daemons' registry mirror; http:// for plain HTTP) "
+        "before pulling, so the fleet downloads it over the LAN; non-Docker Hub images go under HOST/<registry>/ "
+        "and need a containerd hosts.toml to be used",
+    )
+    parser.add_argument(
+        "--mirror-workers",
+        type=positive_int,
+        default=8,
+        metavar="N",
+        help="Blobs copied into the mirror at once (default: 8)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Check only references due by their tag's interval (latest/main hourly, floating tags daily, "
+        "semver weekly), remembering past checks in a state file; meant for frequent cron runs",
+    )
+    parser.add_argument(
+        "--check-interval",
+        type=parse_check_interval,
+        action="append",
+        default=[],
+        metavar="PATTERN=HOURS",
+        help="With --incremental, check repositories matching the glob PATTERN every HOURS instead "
+        "(repeatable; the first match wins)",
+    )
+    opts = Options()
+    parser.parse_args(namespace=opts)
+    if opts.json == opts.ndjson == "-":
+        parser.error("--json and --ndjson cannot both write to stdout")
+    return opts
+
+
+def parse_host_limit(value: str) -> tuple[str, HostLimit]:
+    host, _, spec = value.partition("=")
+    concurrency, _, rate = spec.partition(":")
+    # Normalize the way image references are, so "docker.io" names the host actually contacted.
+    host = ImageRef.parse(f"{host}/probe").host
+    try:
+        # Without a RATE the host keeps its own pace, so capping Docker Hub's concurrency keeps its low rate.
+        limit = HostLimit(int(concurrency), float(rate) if rate else _REGISTRY_LIMITS.get(host, _DEFAULT_LIMIT).rate)
+    except ValueError as exc:
+        msg = f"expected HOST=N[:RATE], got {value!r}"
+        raise ArgumentTypeError(msg) from exc
+    if limit.concurrency < 1 or not limit.rate > 0:
+        msg = f"N must be at least 1 and RATE above 0, got {value!r}"
+        raise ArgumentTypeError(msg)
+    return host, limit
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        msg = f"expected a positive integer, got {value!r}"
+        raise ArgumentTypeError(msg)
+    return number
+
+
+def size_arg(value: str) -> int:
+    # parse_size reads docker's own output and shrugs off oddities; a typo on the command line must not become 0.
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([A-Za-z]*)\s*", value)
+    if not match or (unit := match.group(2).lower() or "b") not in _SIZE_UNITS:
+        msg = f"expected a size such as 500MB or 4GB, got {value!r}"
+        raise ArgumentTypeError(msg)
+    return int(float(match.group(1)) * _SIZE_UNITS[unit])
+
+
+def parse_check_interval(value: str) -> tuple[str, timedelta]:
+    pattern, _, hours = value.rpartition("=")
+    try:
+        interval = timedelta(hours=float(hours))
+    except ValueError as exc:
+        msg = f"expected PATTERN=HOURS, got {value!r}"
+        raise ArgumentTypeError(msg) from exc
+    if not pattern:
+        msg = f"expected PATTERN=HOURS, got {value!r}"
+        raise ArgumentTypeError(msg)
+    return pattern, interval
+
+
+def scan_images(daemon: Daemon, label: str = "") -> tuple[list[ImageStatus], list[str]]:
+    rows = daemon.list_images()
+    inspected = daemon.inspect_images([row[1] for row in rows])
+    runs = last_used_times(daemon, label)
     cutoff: datetime = datetime.now(UTC) - _STALE_LOCAL_AGE
     registry: list[ImageStatus] = []
     stale_local: list[str] = []
@@ -98,10 +407,12 @@ def scan_images() -> tuple[list[ImageStatus], list[str]]:
                 ImageStatus(
                     image=image,
                     local=digest if digest.startswith("sha256:") else "",
+                    image_id=image_id,
                     size=size,
                     created=created,
                     platform=image_platform,
                     registry_digests=matched,
+                    daemon=label,
                 )
             )
         elif (last_active := runs.get(image_id, created)) is not None and last_active < cutoff:
@@ -110,61 +421,55 @@ def scan_images() -> tuple[list[ImageStatus], list[str]]:
     return registry, stale_local
 
 
-def bulk_inspect(image_ids: list[str]) -> dict[str, tuple[set[str], datetime | None, str]]:
-    if not image_ids:
-        return {}
-    result: subprocess.CompletedProcess[str] = subprocess.run(
-        [
-            "docker",
-            "image",
-            "inspect",
-            "--format",
-            "{{.Id}}\t{{json .RepoDigests}}\t{{.Created}}\t{{.Os}}/{{.Architecture}}",
-            *sorted(set(image_ids)),
-        ],
-        check=False,
-        capture_output=True,
-        text=True,
-    )
-    inspected: dict[str, tuple[set[str], datetime | None, str]] = {}
-    for line in result.stdout.splitlines():
-        image_id, _, rest = line.partition("\t")
-        digests_json, _, rest = rest.partition("\t")
-        created, _, image_platform = rest.partition("\t")
-        # {{json .RepoDigests}} emits "null" for a nil slice, which json.loads -> None; coerce to empty.
-        digests = json.loads(digests_json) if digests_json.strip() else []
-        inspected[image_id] = (set(digests or []), parse_created(created), image_platform)
-    return inspected
-
-
-def last_run_times() -> dict[str, datetime]:
-    # The only signal for when an image was last run is a container's State.StartedAt; with ephemeral
-    # (--rm) containers none survive, so scan_images falls back to the image build time.
-    container_ids: list[str] = subprocess.run(
-        ["docker", "ps", "-a", "--no-trunc", "--format", "{{.ID}}"],
-        check=False,
-        capture_output=True,
-        text=True,
-    ).stdout.split()
-    if not container_ids:
-        return {}
-    result: subprocess.CompletedProcess[str] = subprocess.run(
-        ["docker", "container", "inspect", "--format", "{{.Image}}\t{{.State.StartedAt}}", *container_ids],
-        check=False,
-        capture_output=True,
-        text=True,
-    )
-    runs: dict[str, datetime] = {}
-    for line in result.stdout.splitlines():
-        image_id, _, started = line.partition("\t")
-        # Docker's zero time marks a container that was created but never started
-        if started.startswith("0001"):
-            continue
-        if (when := parse_created(started)) and when > runs.get(image_id, _OLDEST):
+def last_used_times(daemon: Daemon, label: str) -> dict[str, datetime]:
+    # Surviving containers cover starts from before the listener ran; the index covers --rm ones since.
+    runs = daemon.last_run_times()
+    for image_id, when in UsageIndex(usage_index_path(label)).load().items():
+        if when > runs.get(image_id, _OLDEST):
             runs[image_id] = when
     return runs
 
 
+def usage_index_path(label: str) -> Path:
+    # Image ids are content hashes shared across hosts, so each fleet member keeps its own index.
+    suffix = f"-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}" if label else ""
+    return _CACHE_DIR / f"last-used{suffix}.tsv"
+
+
+def listen_for_starts(daemons: dict[str, Daemon]) -> None:
+    """
+    Record every container start into a per-daemon usage index until interrupted.
+
+    Containers run with --rm leave no trace to read a last run from; later runs merge the index into their
+    last-use times.
+    """
+    # One event stream per fleet member, each into its own index; the streams block, so each gets a thread, and
+    # they are daemon threads so Ctrl-C in the main thread ends them all.
+    listeners: list[threading.Thread] = []
+    for label, daemon in daemons.items():
+        index = UsageIndex(usage_index_path(label))
+        index.compact()
+        prefix = f"{label}: " if label else ""
+        _CONSOLE.print(f"[bright_black]{prefix}Recording container starts to {index.path}; Ctrl-C stops.[/]")
+        listener = threading.Thread(target=record_starts, args=(daemon, index, label), daemon=True)
+        listener.start()
+        listeners.append(listener)
+    try:
+        for listener in listeners:
+            listener.join()
+    except KeyboardInterrupt:
+        pass
+
+
+def record_starts(daemon: Daemon, index: UsageIndex, label: str) -> None:
+    # A daemon that goes away stops only its own listener.
+    try:
+        for image_id, started in daemon.watch_starts():
+            index.record(image_id, started)
+    except Exception as exc:  # noqa: BLE001
+        _CONSOLE.print(f"[red]{label or 'local daemon'}: stopped listening: {escape(short_error(str(exc), 120))}[/]")
+
+
 def has_registry_host(repo: str) -> bool:
     # Docker treats the part before the first "/" as a registry host only when it looks like one
     # (contains "." or ":", or is "localhost"); otherwise the ref defaults to docker.io, so a local
@@ -191,45 +496,407 @@ def parse_created(value: str) -> datetime | None:
         return None
 
 
-def update_registry_images(images: list[ImageStatus]) -> None:
-    lock = threading.Lock()
-    with (
-        Live(render(images, lock), console=_CONSOLE, refresh_per_second=12, transient=True) as live,
-        ThreadPoolExecutor() as executor,
-    ):
-        futures = {executor.submit(process_image, status, lock): status for status in images}
-        while any(not future.done() for future in futures):
-            live.update(render(images, lock))
-            time.sleep(0.1)
+def check_interval(image: str, overrides: list[tuple[str, timedelta]]) -> timedelta:
+    repo, _, tag = image.rpartition(":")
+    if (interval := next((hours for pattern, hours in overrides if fnmatchcase(repo, pattern)), None)) is not None:
+        return interval
+    if tag in _MOVING_TAGS:
+        return _MOVING_INTERVAL
+    return _PINNED_INTERVAL if _PINNED_TAG_RE.fullmatch(tag) else _FLOATING_INTERVAL
+
+
+def next_check(status: ImageStatus, record: CheckRecord, interval: timedelta) -> float:
+    if interval <= _MOVING_INTERVAL:
+        return record.checked + interval.total_seconds()
+    # A fixed per-reference phase in [0.5, 1.5) of the interval: the images of one full sweep come due over
+    # the following runs instead of all in the same one.
+    phase = int.from_bytes(hashlib.sha256(f"{status.image_id} {status.image}".encode()).digest()[:4]) / 2**32
+    return record.checked + interval.total_seconds() * (0.5 + phase)
+
+
+def report_deferred(images: list[ImageStatus]) -> None:
+    if deferred := [status for status in images if status.state == "deferred"]:
+        _CONSOLE.print(
+            f"[bright_black]Skipped {len(deferred)} of {len(images)} image(s) checked within their interval.[/]"
+        )
+
+
+def update_registry_images(
+    images: list[ImageStatus],
+    lookups: DigestLookups,
+    client: RegistryClient,
+    daemons: dict[str, Daemon],
+    opts: Options,
+) -> None:
+    """Check every image, then pull: the planner needs each new manifest's layers before it can order pulls."""
+    with StatusBoard(images) as board:
+        plans = [
+            plan
+            for plan in run_per_host(images, lambda status: check_image(status, board, lookups, client), client, board)
+            if plan is not None
+        ]
+        if opts.mirror and plans:
+            warm_mirror(plans, client, board, opts)
+        # Layers and the byte budget are per daemon: each one downloads over its own link into its own store.
+        by_daemon: dict[str, list[PullPlan]] = {}
+        for plan in plans:
+            by_daemon.setdefault(plan.status.daemon, []).append(plan)
+        with ThreadPoolExecutor(max_workers=max(len(by_daemon), 1)) as executor:
+            for future in [
+                executor.submit(run_pulls, group, board, client.limits, daemons[label], opts)
+                for label, group in by_daemon.items()
+            ]:
+                future.result()
+    _CONSOLE.print(render(images))
+
+
+def run_per_host[T](
+    images: list[ImageStatus], work: Callable[[ImageStatus], T], client: RegistryClient, board: StatusBoard
+) -> list[T | None]:
+    with ExitStack() as pools:
+        # One bounded pool per registry host: a throttled host queues its own images without holding
+        # worker threads that images on other registries could be using.
+        executors: dict[str, ThreadPoolExecutor] = {}
+        futures: dict[Future[T], ImageStatus] = {}
+        for status in images:
+            host = ImageRef.parse(status.image).host
+            if (executor := executors.get(host)) is None:
+                workers = client.limits.for_host(host).concurrency
+                executor = executors[host] = pools.enter_context(ThreadPoolExecutor(max_workers=workers))
+            futures[executor.submit(work, status)] = status
+    return [future_result(future, status, board) for future, status in futures.items()]
+
+
+def future_result[T](future: Future[T], status: ImageStatus, board: StatusBoard) -> T | None:
     # Surface worker exceptions instead of leaving the image stuck at "checking" with no error.
-    for future, status in futures.items():
-        try:
-            future.result()
-        except Exception as exc:  # noqa: BLE001
-            with lock:
-                status.state = "error"
-                status.detail = str(exc)
-    _CONSOLE.print(render(images, lock))
+    try:
+        return future.result()
+    except Exception as exc:  # noqa: BLE001
+        board.update(status, state="error", detail=str(exc))
+        return None
 
 
-def process_image(status: ImageStatus, lock: threading.Lock) -> None:
+def check_image(
+    status: ImageStatus, board: StatusBoard, lookups: DigestLookups, client: RegistryClient
+) -> PullPlan | None:
     started: float = time.monotonic()
-    remote, reason = crane_digest(status.image)
+    remote, reason, cached = lookups.resolve(status.image)
+    timing = {"remote": remote or "", "digest_time": time.monotonic() - started}
     if remote is None:
-        finish(status, lock, "unreachable", started, reason)
-        return
+        finish(status, board, "unreachable", started, reason, reason=reason or "registry unreachable", **timing)
+        return None
     if remote == status.local or remote in status.registry_digests:
-        finish(status, lock, "up to date", started)
-        return
-    with lock:
-        status.state = "pulling"
-    ok, error, downloaded = docker_pull(status.image)
+        decision = "cached digest unchanged" if cached else "digest unchanged"
+        finish(status, board, "up to date", started, "cached" if cached else "", reason=decision, **timing)
+        return None
+    if platform_unchanged(status, remote, client):
+        decision = "only other platforms moved"
+        finish(status, board, "up to date", started, "other platforms moved", reason=decision, **timing)
+        return None
+    plan = plan_pull(status, remote, client)
+    plan.checked = time.monotonic() - started
+    expected = plan.expected(set(plan.present))
+    board.update(status, state="queued", expected=expected, duration=plan.checked, reason="digest moved", **timing)
+    return plan
+
+
+def platform_unchanged(status: ImageStatus, remote: str, client: RegistryClient) -> bool:
+    # A tag usually names an index, whose digest moves when any platform is rebuilt. The local image id is
+    # the config digest of the platform manifest it was pulled from, so a match means our platform is current.
+    ref = dataclasses.replace(ImageRef.parse(status.image), reference=remote)
+    if (resolved := client.platform_manifest(ref, status.platform or f"linux/{_HOST_ARCH}")) is None:
+        return False
+    digest, manifest = resolved
+    return digest in status.registry_digests or manifest.get("config", {}).get("digest") == status.image_id
+
+
+def warm_mirror(plans: list[PullPlan], client: RegistryClient, board: StatusBoard, opts: Options) -> None:
+    """
+    Copy every planned update into the mirror once, however many daemons will pull it.
+
+    Manifests for the platforms in use are copied byte for byte, since their digests must not change. Each
+    blob is downloaded once into the spool, then uploaded to (or mounted into) every mirror repository
+    that needs it; blobs the mirror already holds are skipped.
+
+    Docker Hub images keep their own path, the layout dockerd's `registry-mirrors` expects; that setting
+    covers Docker Hub only. Every other registry is namespaced by its host (`ghcr.io/org/app` lands in
+    `<mirror>/ghcr.io/org/app`), so same-named repositories on different registries never share tags. A
+    daemon reaches those through the containerd image store, with one `hosts.toml` per upstream, e.g.
+    /etc/containerd/certs.d/ghcr.io/hosts.toml:
+
+        [host."http://mirror:5000/v2/ghcr.io"]
+          capabilities = ["pull", "resolve"]
+          override_path = true
+    """
+    mirror = opts.mirror or ""
+    host = mirror.removeprefix("http://").removeprefix("https://").rstrip("/")
+    if mirror.startswith("http://"):
+        client.plain_http.add(host)
+    jobs: dict[tuple[str, str, str], MirrorJob] = {}
+    for plan in plans:
+        ref = ImageRef.parse(plan.status.image)
+        key = (ref.host, ref.repository, plan.remote)
+        if (job := jobs.get(key)) is None:
+            # A repository name can't hold a ":", so a port joins its host with "_" (localhost_5000/app).
+            namespace = ref.host.replace(":", "_")
+            repository = ref.repository if ref.host == _DOCKER_HUB else f"{namespace}/{ref.repository}"
+            job = jobs[key] = MirrorJob(
+                dataclasses.replace(ref, reference=plan.remote), ImageRef(host, repository, plan.remote)
+            )
+        if not ref.reference.startswith("sha256:"):
+            job.tags.add(ref.reference)
+        job.platforms.add(plan.status.platform or f"linux/{_HOST_ARCH}")
+        job.statuses.append(plan.status)
+        board.update(plan.status, state="mirroring")
+
+    def resolve(job: MirrorJob) -> str:
+        return mirror_failure(resolve_mirror_job, job, client)
+
+    with ThreadPoolExecutor(max_workers=opts.mirror_workers) as executor:
+        resolved = dict(zip(jobs.values(), executor.map(resolve, jobs.values()), strict=True))
+        # One task per blob: a layer shared by several images is downloaded once and mounted elsewhere.
+        targets: dict[str, list[MirrorJob]] = {}
+        for job, error in resolved.items():
+            for digest in job.blobs if not error else ():
+                targets.setdefault(digest, []).append(job)
+        copies = dict(
+            zip(targets, executor.map(lambda item: copy_blob(client, item[0], item[1]), targets.items()), strict=True)
+        )
+    for job, error in resolved.items():
+        failed = error or next((copies[digest] for digest in sorted(job.blobs) if copies.get(digest)), "")
+        detail = f"mirror: {failed}" if failed else mirror_failure(publish_mirror_job, job, client) or "mirrored"
+        for status in job.statuses:
+            board.update(status, state="queued", detail=detail)
+
+
+def mirror_failure(step: Callable[[MirrorJob, RegistryClient], str], job: MirrorJob, client: RegistryClient) -> str:
+    try:
+        return step(job, client)
+    except (RegistryError, ValueError, OSError) as exc:
+        return short_error(str(exc))
+
+
+def resolve_mirror_job(job: MirrorJob, client: RegistryClient) -> str:
+    raw, media_type = client.manifest_bytes(job.source)
+    top = json.loads(raw)
+    if "manifests" in top:
+        # Only the platforms the fleet runs are copied; the rest of the index stays upstream.
+        for image_platform in sorted(job.platforms):
+            if (entry := platform_entry(top, image_platform)) is not None:
+                child = dataclasses.replace(job.source, reference=entry["digest"])
+                job.manifests.append((entry["digest"], *client.manifest_bytes(child)))
+    job.manifests.append((job.source.reference, raw, media_type))
+    for _digest, body, _media_type in job.manifests:
+        if "layers" in (manifest := json.loads(body)):
+            job.blobs |= {manifest["config"]["digest"], *(layer["digest"] for layer in manifest["layers"])}
+    return ""
+
+
+def copy_blob(client: RegistryClient, digest: str, jobs: list[MirrorJob]) -> str:
+    spooled: list[Path] = []
+
+    def spool() -> Path:
+        # Downloaded on first need only: a blob the mirror can mount from another repository never is.
+        if not spooled:
+            spooled.append(spool_blob(client, jobs[0].source, digest))
+        return spooled[0]
+
+    mounted_from = ""
+    try:
+        for job in jobs:
+            if not client.blob_exists(job.target, digest):
+                client.upload_blob(job.target, digest, spool, mounted_from)
+            mounted_from = job.target.repository
+    except (RegistryError, OSError) as exc:
+        return short_error(str(exc))
+    finally:
+        # Only an interrupted download is worth keeping (its .partial resumes); a finished one goes either way.
+        for path in spooled:
+            path.unlink(missing_ok=True)
+    return ""
+
+
+def spool_blob(client: RegistryClient, ref: ImageRef, digest: str) -> Path:
+    # The partial file outlives the run: a download cut off by a crash or Ctrl-C resumes from its length.
+    target = _CACHE_DIR / "blobs" / digest.replace(":", "-")
+    partial = target.with_suffix(".partial")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    for attempt in range(_MAX_RETRIES + 1):
+        try:
+            client.download_blob(ref, digest, partial)
+            break
+        except RegistryError:
+            if attempt == _MAX_RETRIES:
+                raise
+            time.sleep(backoff_delay(attempt))
+    hasher = hashlib.sha256()
+    with partial.open("rb") as handle:
+        while chunk := handle.read(1 << 20):
+            hasher.update(chunk)
+    if f"sha256:{hasher.hexdigest()}" != digest:
+        partial.unlink()
+        msg = f"blob {short_digest(digest)} failed verification"
+        raise RegistryError(msg)
+    partial.replace(target)
+    return target
+
+
+def publish_mirror_job(job: MirrorJob, client: RegistryClient) -> str:
+    *children, (digest, raw, media_type) = job.manifests
+    for child_digest, child_raw, child_type in children:
+        client.put_manifest(job.target, child_digest, child_raw, child_type)
+    try:
+        for reference in (digest, *sorted(job.tags)):
+            client.put_manifest(job.target, reference, raw, media_type)
+    except RegistryError:
+        if not children:
+            raise
+        # Registries may refuse an index whose other platforms are missing; the daemon then resolves the tag
+        # upstream but still finds the platform manifest and every blob in the mirror.
+        return "mirrored, index refused"
+    return ""
+
+
+def plan_pull(status: ImageStatus, remote: str, client: RegistryClient) -> PullPlan:
+    # The layers of the digest being replaced are already local, so only the difference will download.
+    ref = ImageRef.parse(status.image)
+    image_platform = status.platform or f"linux/{_HOST_ARCH}"
+    layers = client.layer_sizes(dataclasses.replace(ref, reference=remote), image_platform)
+    present: dict[str, int] = {}
+    for digest in sorted({status.local, *status.registry_digests} - {""}):
+        present |= client.layer_sizes(dataclasses.replace(ref, reference=digest), image_platform) or {}
+    return PullPlan(status, remote, ref.host, layers, present)
+
+
+def run_pulls(plans: list[PullPlan], board: StatusBoard, limits: RegistryLimits, daemon: Daemon, opts: Options) -> None:
+    """
+    Dispatch pulls in an order that fetches layers shared between images once.
+
+    A pull waits while another pull is fetching a layer it also needs, so the second one finds the layer
+    local instead of downloading it again. Among the rest, the one whose missing layers are most shared with
+    still-pending images goes first, then the smallest, so small images don't queue behind a huge one. A
+    pull starts only if its expected bytes fit the in-flight budget (or nothing else is running) and its
+    registry host is below its concurrency cap.
+    """
+    pending = list(plans)
+    present: set[str] = {layer for plan in plans for layer in plan.present}
+    fetching: Counter[str] = Counter()
+    per_host: Counter[str] = Counter()
+    running: dict[Future[bool], tuple[PullPlan, int, set[str]]] = {}
+    with ThreadPoolExecutor(max_workers=opts.pull_workers) as executor:
+        while pending or running:
+            for future in [future for future in running if future.done()]:
+                plan, _expected, reserved = running.pop(future)
+                if future_result(future, plan.status, board):
+                    present.update(plan.layers or {})
+                fetching -= Counter(reserved)
+                per_host[plan.host] -= 1
+            in_flight = sum(expected for _plan, expected, _reserved in running.values())
+            if len(running) < opts.pull_workers and (
+                plan := next_pull(pending, present, fetching, per_host, in_flight, limits, opts.pull_budget)
+            ):
+                pending.remove(plan)
+                reserved = plan.missing(present)
+                fetching.update(reserved)
+                per_host[plan.host] += 1
+                # Layers pulled since planning no longer download; show what this pull will fetch now.
+                board.update(plan.status, expected=plan.expected(present))
+                running[executor.submit(pull_image, plan, board, daemon)] = (plan, plan.expected(present), reserved)
+                continue
+            wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+
+
+def next_pull(  # noqa: PLR0913, PLR0917
+    pending: list[PullPlan],
+    present: set[str],
+    fetching: Counter[str],
+    per_host: Counter[str],
+    in_flight: int,
+    limits: RegistryLimits,
+    budget: int,
+) -> PullPlan | None:
+    shared = Counter(layer for plan in pending for layer in plan.missing(present))
+    ready = [
+        plan
+        for plan in pending
+        if per_host[plan.host] < limits.for_host(plan.host).concurrency
+        and not plan.missing(present) & fetching.keys()
+        and (not in_flight or in_flight + plan.expected(present) <= budget)
+    ]
+
+    def priority(plan: PullPlan) -> tuple[int, int]:
+        sizes = plan.layers or {}
+        return sum(sizes[layer] for layer in plan.missing(present) if shared[layer] > 1), -plan.expected(present)
+
+    return max(ready, key=priority, default=None)
+
+
+def pull_image(plan: PullPlan, board: StatusBoard, daemon: Daemon) -> bool:
+    status = plan.status
+    # The clock resumes where the check left off, so time spent queued for the budget isn't billed to the image.
+    started = time.monotonic() - plan.checked
+    pull_started = time.monotonic()
+    board.update(status, state="pulling")
+    ok, error, layers = daemon.pull(status.image)
+    for attempt in range(_MAX_RETRIES):
+        if ok or error != _RATE_LIMITED:
+            break
+        delay = backoff_delay(attempt)
+        board.update(status, detail=f"rate limited, retry in {delay:.0f}s")
+        time.sleep(delay)
+        board.update(status, detail="")
+        ok, error, layers = daemon.pull(status.image)
+    pull_time = time.monotonic() - pull_started
     if not ok:
-        finish(status, lock, "failed", started, error)
-        return
-    finish(
-        status, lock, "updated", started, update_detail(status.local, remote, downloaded, time.monotonic() - started)
-    )
+        finish(status, board, "failed", started, error, reason=f"pull failed: {error}", pull_time=pull_time)
+        return False
+    detail = update_detail(status.local, plan.remote, sum(layers.values()), pull_time)
+    finish(status, board, "updated", started, detail, pull_time=pull_time, layers=layers)
+    return True
+
+
+def remote_digest(image: str, cache: DigestCache, client: RegistryClient) -> tuple[str | None, str, bool]:
+    if (entry := cache.get(image)) is not None and cache.is_fresh(entry):
+        return entry.digest, "", True
+    # Past the TTL a conditional manifest HEAD revalidates; a 304 confirms the cached digest without a body.
+    try:
+        head = client.head_manifest(image, entry.etag if entry else "")
+    except RegistryError:
+        # The client only speaks token and basic auth; crane also covers identity tokens and exotic setups.
+        digest, reason = crane_digest(image)
+        if digest is not None:
+            cache.put(image, digest)
+        return digest, reason, False
+    if head.not_modified and entry is not None:
+        cache.put(image, entry.digest, entry.etag)
+        return entry.digest, "", True
+    cache.put(image, head.digest, head.etag)
+    return head.digest, "", False
+
+
+class DigestLookups:
+    """Collapses lookups of one reference into a single registry check, however many daemons hold it."""
+
+    def __init__(self, cache: DigestCache, client: RegistryClient) -> None:
+        self.cache = cache
+        self.client = client
+        self.futures: dict[str, Future[tuple[str | None, str, bool]]] = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, image: str) -> tuple[str | None, str, bool]:
+        with self.lock:
+            owner = (future := self.futures.get(image)) is None
+            if future is None:
+                future = self.futures[image] = Future()
+        if owner:
+            try:
+                future.set_result(remote_digest(image, self.cache, self.client))
+            except Exception as exc:
+                future.set_exception(exc)
+                raise
+        digest, reason, cached = future.result()
+        # Only the first holder paid for the check; the others reuse it like a cache hit.
+        return digest, reason, cached or not owner
 
 
 def crane_digest(image: str) -> tuple[str | None, str]:
@@ -253,34 +920,10 @@ def short_error(text: str, limit: int = 44) -> str:
     return next((stripped for raw in reversed(text.splitlines()) if (stripped := raw.strip())), "")[:limit]
 
 
-def docker_pull(image: str) -> tuple[bool, str, int]:
-    # A pty makes docker emit per-layer progress ("Downloading [..] done/total"); summing each
-    # layer's total yields the bytes actually fetched, which the non-tty capture_output never prints.
-    layer_totals: dict[str, int] = {}
-    output: list[str] = []
-    pid, fd = pty.fork()
-    if pid == 0:
-        try:
-            os.execvp("docker", ["docker", "pull", image])
-        except OSError:
-            os._exit(127)
-    try:
-        while True:
-            try:
-                data = os.read(fd, 65536)
-            except OSError:
-                break
-            if not data:
-                break
-            text = data.decode("utf-8", "replace")
-            output.append(text)
-            for layer, total in _DOWNLOAD_RE.findall(text):
-                layer_totals[layer] = parse_size(total)
-    finally:
-        os.close(fd)
-    if os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) == 0:
-        return True, "", sum(layer_totals.values())
-    return False, short_error("".join(output)), 0
+def backoff_delay(attempt: int, retry_after: str = "") -> float:
+    if retry_after.isdigit():
+        return float(retry_after)
+    return min(2.0**attempt, 60.0)
 
 
 def parse_size(text: str) -> int:
@@ -308,38 +951,146 @@ def format_bytes(num: float) -> str:
     return f"{num:.1f}TB"
 
 
-def finish(status: ImageStatus, lock: threading.Lock, state: str, started: float, detail: str = "") -> None:
-    with lock:
-        status.state = state
-        status.detail = detail
-        status.duration = time.monotonic() - started
+def finish(
+    status: ImageStatus,
+    board: StatusBoard,
+    state: str,
+    started: float,
+    detail: str = "",
+    **record: Any,  # noqa: ANN401
+) -> None:
+    board.update(status, state=state, detail=detail, duration=time.monotonic() - started, **record)
+
+
+def write_output(text: str, target: str) -> None:
+    if target == "-":
+        sys.stdout.write(text)
+        return
+    try:
+        Path(target).write_text(text, encoding="utf-8")
+    except OSError as exc:
+        _CONSOLE.print(f"[red]Could not write results to {target}: {exc}[/]")
+
+
+def run_document(images: list[ImageStatus], wall_time: float, failed: dict[str, str]) -> dict[str, Any]:
+    records = list(run_records(images, wall_time, failed))
+    return {
+        "images": [record for record in records if record["type"] == "image"],
+        "registries": {record["registry"]: record for record in records if record["type"] == "registry"},
+        "run": next(record for record in records if record["type"] == "run"),
+    }
+
+
+def run_records(images: list[ImageStatus], wall_time: float, failed: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """
+    What the run measured, for `--json`/`--ndjson`.
+
+    Per image the digest and pull time, bytes per layer, the decision and its registry; per registry the pull
+    throughput and p50/p95 latencies; last the run as a whole.
+    """
+    by_registry: dict[str, list[ImageStatus]] = {}
+    for status in images:
+        host = ImageRef.parse(status.image).host
+        by_registry.setdefault(host, []).append(status)
+        yield {
+            "type": "image",
+            "image": status.image,
+            "daemon": status.daemon,
+            "registry": host,
+            "state": status.state,
+            "reason": status.reason,
+            "local": status.local,
+            "remote": status.remote,
+            "digest_time": round_time(status.digest_time),
+            "pull_time": round_time(status.pull_time),
+            "expected_bytes": status.expected,
+            "downloaded_bytes": sum(status.layers.values()),
+            "layers": status.layers,
+        }
+    for host, statuses in sorted(by_registry.items()):
+        pulled = [status for status in statuses if status.pull_time is not None]
+        downloaded = sum(sum(status.layers.values()) for status in pulled)
+        pull_seconds = sum(status.pull_time or 0.0 for status in pulled)
+        yield {
+            "type": "registry",
+            "registry": host,
+            "images": len(statuses),
+            "pulled": len(pulled),
+            "states": dict(Counter(status.state for status in statuses)),
+            "downloaded_bytes": downloaded,
+            # Bytes over time spent pulling, not wall time: concurrent pulls would otherwise look slower.
+            "throughput": round(downloaded / pull_seconds) if pull_seconds else None,
+            "digest_time": latency_summary([status.digest_time for status in statuses]),
+            "pull_time": latency_summary([status.pull_time for status in pulled]),
+        }
+    yield {
+        "type": "run",
+        "images": len(images),
+        "pulled": sum(status.pull_time is not None for status in images),
+        "downloaded_bytes": sum(sum(status.layers.values()) for status in images),
+        "wall_time": round(wall_time, 4),
+        # Daemons whose images could not be listed, with why; their images are absent from the records above.
+        "failed_daemons": failed,
+    }
+
+
+def latency_summary(samples: list[float | None]) -> dict[str, float] | None:
+    if not (values := [value for value in samples if value is not None]):
+        return None
+    return {
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile: every value reported is one that was observed."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def round_time(value: float | None) -> float | None:
+    return None if value is None else round(value, 4)
 
 
-def render(images: list[ImageStatus], lock: threading.Lock) -> Table:
-    table: Table = Table(title="Docker Image Update Summary", box=box.SIMPLE_HEAVY)
+def render(images: list[ImageStatus]) -> Table:
+    fleet = any(status.daemon for status in images)
+    return status_table([status_row(index, status, fleet=fleet) for index, status in enumerate(images, 1)], fleet=fleet)
+
+
+def status_table(rows: Iterable[list[str]], *, fleet: bool, caption: str = "") -> Table:
+    table: Table = Table(title="Docker Image Update Summary", caption=caption or None, box=box.SIMPLE_HEAVY)
     table.add_column("#", justify="right")
+    if fleet:
+        table.add_column("Daemon", style="cyan")
     table.add_column("Image", style="bold")
     table.add_column("Platform")
     table.add_column("Status")
     table.add_column("Updated", justify="right")
     table.add_column("Size", justify="right")
+    table.add_column("Download", justify="right")
     table.add_column("Time", justify="right")
-    with lock:
-        rows = [(s.image, s.platform, s.state, s.detail, s.created, s.size, s.duration) for s in images]
-    for index, (image, image_platform, state, detail, created, size, duration) in enumerate(rows, 1):
-        styled: str = f"[{_STATE_STYLE.get(state, '')}]{state}{f' [dim]({detail})[/dim]' if detail else ''}[/]"
-        table.add_row(
-            str(index),
-            image,
-            render_platform(image_platform),
-            styled,
-            format_age(created),
-            size,
-            format_duration(duration),
-        )
+    for row in rows:
+        table.add_row(*row)
     return table
 
 
+def status_row(index: int, status: ImageStatus, *, fleet: bool) -> list[str]:
+    detail = f" [dim]({status.detail})[/dim]" if status.detail else ""
+    return [
+        str(index),
+        *([status.daemon] if fleet else []),
+        status.image,
+        render_platform(status.platform),
+        f"[{_STATE_STYLE.get(status.state, '')}]{status.state}{detail}[/]",
+        format_age(status.created),
+        status.size,
+        "" if status.expected is None else format_bytes(status.expected),
+        format_duration(status.duration),
+    ]
+
+
 def render_platform(image_platform: str) -> str:
     # Flag a mismatch (e.g. an amd64 image pulled onto an arm64 host) so emulated images stand out.
     arch: str = image_platform.split("/")[1] if "/" in image_platform else ""
@@ -368,29 +1119,1375 @@ def format_duration(duration: float | None) -> str:
         return ""
     if duration < 60:
         return f"{duration:.1f}s"
-    return f"{int(duration // 60)}m{int(duration % 60)}s"
+    if duration < 3600:
+        return f"{int(duration // 60)}m{int(duration % 60)}s"
+    return f"{int(duration // 3600)}h{int(duration % 3600 // 60)}m"
+
 
+def tidy_daemon(daemon: Daemon, stale_local: list[str], registry: set[str], label: str, free_target: int) -> None:
+    """
+    Remove dormant local images and prune dangling data.
 
-def cleanup_local(images: list[str]) -> None:
-    # Staleness is decided in scan_images (last run, else build time); `docker rmi` still
+    With `--free-space` the dormancy rule gives way to a disk budget: after pruning, least-recently-used local
+    images no container uses are removed, in one batch, until their unique bytes bring the daemon's data root
+    to the requested free space.
+    """
+    if not free_target:
+        cleanup_local(daemon, stale_local, label)
+        prune_system(daemon, label)
+        return
+    # Dangling data goes first: it is free to drop and may reach the target without touching any image.
+    prune_system(daemon, label)
+    prefix = f"{label}: " if label else ""
+    if (free := daemon.free_space()) is None:
+        _CONSOLE.print(f"[yellow]{prefix}free space of the data root is not visible from here; using dormancy[/]")
+        cleanup_local(daemon, stale_local, label)
+        return
+    if free >= free_target:
+        _CONSOLE.print(f"[bright_black]{prefix}{format_bytes(free)} free, no images need removing.[/]")
+        return
+    plan = plan_removals(daemon.disk_usage(), last_used_times(daemon, label), free_target - free, registry)
+    _CONSOLE.print(render_removal_plan(plan, free, free_target, label))
+    if not plan:
+        return
+    outcomes = daemon.remove_images([reference for entry in plan for reference in entry.references])
+    report_removals(outcomes, f"{prefix}Removed {{count}} reference(s) to free space:")
+    freed = sum(entry.unique for entry in plan if not any(outcomes.get(ref) for ref in entry.references))
+    _CONSOLE.print(f"[bright_black]{prefix}About {format_bytes(freed)} freed.[/]")
+
+
+def plan_removals(images: list[DiskImage], runs: dict[str, datetime], need: int, registry: set[str]) -> list[DiskImage]:
+    """The least-recently-used local images, no more than needed, whose unique bytes add up to `need`."""
+    # The CLI reports short image ids, so match run times on the 12-character prefix both forms share.
+    last_runs = {short_digest(image_id): when for image_id, when in runs.items()}
+    for image in images:
+        image.last_used = last_runs.get(short_digest(image.image_id), image.created)
+    # An image a container references (even a stopped one) can't be removed, so it never enters the plan. Nor
+    # does a registry image, which may just have been pulled; it is matched by tag, as the pull changed its id.
+    candidates = sorted(
+        (image for image in images if not image.containers and registry.isdisjoint(image.references)),
+        key=lambda image: image.last_used or _OLDEST,
+    )
+    chosen: list[DiskImage] = []
+    total = 0
+    for image in candidates:
+        if total >= need:
+            break
+        chosen.append(image)
+        total += image.unique
+    # The last pick may overshoot enough to cover a smaller earlier one; keep the set minimal.
+    for image in sorted(chosen, key=lambda image: image.unique):
+        if total - image.unique >= need:
+            chosen.remove(image)
+            total -= image.unique
+    return chosen
+
+
+def render_removal_plan(plan: list[DiskImage], free: int, target: int, label: str) -> Table:
+    title = f"{label}: " if label else ""
+    table: Table = Table(
+        title=f"{title}Removal plan ({format_bytes(free)} free, target {format_bytes(target)})", box=box.SIMPLE_HEAVY
+    )
+    table.add_column("#", justify="right")
+    table.add_column("Image", style="bold")
+    table.add_column("Last used", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Reclaimable", justify="right")
+    for index, image in enumerate(plan, 1):
+        table.add_row(
+            str(index),
+            ", ".join(image.references),
+            format_age(image.last_used),
+            format_bytes(image.size),
+            format_bytes(image.unique),
+        )
+    table.add_section()
+    table.add_row("", "[bold]total[/]", "", "", f"[bold]{format_bytes(sum(image.unique for image in plan))}[/]")
+    return table
+
+
+def cleanup_local(daemon: Daemon, images: list[str], label: str = "") -> None:
+    # Staleness is decided in scan_images (last run, else build time); the daemon still
     # refuses to remove an image a container references, a final safety net.
-    if not (removed := [image for image in images if remove_image(image)]):
+    if not images:
         return
-    _CONSOLE.print(f"[bright_black]Removed {len(removed)} stale local image(s) (no registry source):[/]")
-    for image in removed:
-        _CONSOLE.print(f"[bright_black]  {image}[/]")
+    prefix = f"{label}: " if label else ""
+    report_removals(
+        daemon.remove_images(images), f"{prefix}Removed {{count}} stale local image(s) (no registry source):"
+    )
+
+
+def report_removals(outcomes: dict[str, str], heading: str) -> None:
+    # An image a container still references is expected and only noted; anything else is a real failure.
+    removed = [image for image, outcome in outcomes.items() if not outcome]
+    in_use = [image for image, outcome in outcomes.items() if outcome == _IN_USE]
+    failed = [(image, outcome) for image, outcome in outcomes.items() if outcome and outcome != _IN_USE]
+    lines = [f"[bright_black]{heading.format(count=len(removed))}[/]"] if removed else []
+    lines.extend(f"[bright_black]  {image}[/]" for image in removed)
+    lines.extend(f"[dim]  {image} (kept, in use by a container)[/]" for image in in_use)
+    lines.extend(f"[red]  {image} ({error})[/]" for image, error in failed)
+    if lines:
+        _CONSOLE.print("\n".join(lines))
+
+
+def prune_system(daemon: Daemon, label: str = "") -> None:
+    summary, errors = daemon.prune()
+    prefix = f"{label}: " if label else ""
+    # A failed prune must not pass for one that found nothing to reclaim.
+    lines = [f"[bright_black]{prefix}{summary or 'Pruned dangling docker data.'}[/]"]
+    lines.extend(f"[red]  prune failed: {escape(error)}[/]" for error in errors)
+    _CONSOLE.print("\n".join(lines))
+
+
+class StatusBoard:
+    """
+    Live view of the image states, fed by the workers through a queue.
+
+    Workers never wait on the display: `update` only enqueues the change. A single renderer thread applies
+    queued changes, re-formats just the rows they touched, and redraws no more often than drawing costs
+    allow. Past `_COMPACT_ROWS` images it shows per-state counts and the pulls in flight instead of every row.
+    """
+
+    def __init__(self, images: list[ImageStatus]) -> None:
+        self.images = images
+        self.fleet = any(status.daemon for status in images)
+        self.index = {id(status): index for index, status in enumerate(images)}
+        self.rows = [status_row(index, status, fleet=self.fleet) for index, status in enumerate(images, 1)]
+        self.changes: SimpleQueue[tuple[ImageStatus, dict[str, Any]]] = SimpleQueue()
+        self.stopped = threading.Event()
+        self.live = Live(self.view(), console=_CONSOLE, auto_refresh=False, transient=True)
+        self.renderer = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self) -> Self:
+        self.live.start(refresh=True)
+        self.renderer.start()
+        return self
 
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.stopped.set()
+        self.renderer.join()
+        self.apply()
+        self.live.stop()
 
-def remove_image(image: str) -> bool:
-    return subprocess.run(["docker", "rmi", image], check=False, capture_output=True, text=True).returncode == 0
+    def update(self, status: ImageStatus, **changes: Any) -> None:  # noqa: ANN401
+        self.changes.put((status, changes))
 
+    def run(self) -> None:
+        interval = _MIN_REDRAW
+        while not self.stopped.wait(interval):
+            if not self.apply():
+                continue
+            started = time.monotonic()
+            self.live.update(self.view(), refresh=True)
+            # Keep drawing under a tenth of the renderer's time, so a huge table slows its frame rate, not the run.
+            interval = min(max(10 * (time.monotonic() - started), _MIN_REDRAW), _MAX_REDRAW)
 
-def prune_system() -> None:
-    result: subprocess.CompletedProcess[str] = subprocess.run(
-        ["docker", "system", "prune", "-f", "--volumes"], check=False, capture_output=True, text=True
+    def apply(self) -> bool:
+        touched: set[int] = set()
+        while True:
+            try:
+                status, changes = self.changes.get_nowait()
+            except Empty:
+                break
+            for name, value in changes.items():
+                setattr(status, name, value)
+            touched.add(self.index[id(status)])
+        for index in touched:
+            self.rows[index] = status_row(index + 1, self.images[index], fleet=self.fleet)
+        return bool(touched)
+
+    def view(self) -> Table:
+        if len(self.images) <= _COMPACT_ROWS:
+            return status_table(self.rows, fleet=self.fleet)
+        counts = Counter(status.state for status in self.images)
+        caption = " · ".join(
+            f"[{_STATE_STYLE.get(state, '')}]{state} {counts[state]}[/]"
+            for state in [*_STATE_STYLE, *sorted(counts.keys() - _STATE_STYLE.keys())]
+            if counts[state]
+        )
+        in_flight = [self.rows[index] for index, status in enumerate(self.images) if status.state == "pulling"]
+        return status_table(in_flight, fleet=self.fleet, caption=caption)
+
+
+@dataclass
+class CachedDigest:
+    digest: str
+    fetched: float
+    etag: str = ""
+
+
+class DigestCache:
+    """Remote manifest digests keyed by image reference, persisted as JSON; within the TTL a check costs nothing."""
+
+    def __init__(self, path: Path, ttl: timedelta, entries: dict[str, CachedDigest]) -> None:
+        self.path = path
+        self.ttl = ttl.total_seconds()
+        self.entries = entries
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, ttl: timedelta) -> DigestCache:
+        try:
+            raw: dict[str, dict[str, object]] = json.loads(path.read_text(encoding="utf-8"))
+            entries = {image: CachedDigest(**entry) for image, entry in raw.items()}  # pyright: ignore [reportArgumentType]
+        except OSError, ValueError, TypeError:
+            # A missing or corrupt cache only costs one full round of registry checks.
+            entries = {}
+        return cls(path, ttl, entries)
+
+    def get(self, image: str) -> CachedDigest | None:
+        with self.lock:
+            return self.entries.get(image)
+
+    def is_fresh(self, entry: CachedDigest) -> bool:
+        return time.time() - entry.fetched < self.ttl
+
+    def put(self, image: str, digest: str, etag: str = "") -> None:
+        with self.lock:
+            self.entries[image] = CachedDigest(digest, time.time(), etag)
+
+    def save(self) -> None:
+        with self.lock:
+            data = {image: asdict(entry) for image, entry in sorted(self.entries.items())}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so an interrupted run never leaves a truncated cache behind.
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        temp.replace(self.path)
+
+
+class UsageIndex:
+    """
+    Image id to last container start, as an append-only TSV of (image id, epoch seconds) lines.
+
+    Appends keep each event to one small write; compaction rewrites the file down to one line per image
+    once the superseded lines outnumber the live ones.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.latest: dict[str, float] = {}
+        self.lines = 0
+
+    def load(self) -> dict[str, datetime]:
+        self.latest, self.lines = {}, 0
+        try:
+            text = self.path.read_text(encoding="utf-8")
+        except OSError:
+            return {}
+        for line in text.splitlines():
+            image_id, _, epoch = line.partition("\t")
+            try:
+                when = float(epoch)
+            except ValueError:
+                # A line torn by a crash mid-append; the next compaction drops it.
+                continue
+            self.lines += 1
+            self.latest[image_id] = max(when, self.latest.get(image_id, 0.0))
+        return {image_id: datetime.fromtimestamp(when, UTC) for image_id, when in self.latest.items()}
+
+    def record(self, image_id: str, started: float) -> None:
+        if started <= self.latest.get(image_id, 0.0):
+            return
+        self.latest[image_id] = started
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(f"{image_id}\t{started:.0f}\n")
+        self.lines += 1
+        if self.lines > max(2 * len(self.latest), 256):
+            self.compact()
+
+    def compact(self) -> None:
+        self.load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(
+            "".join(f"{image_id}\t{when:.0f}\n" for image_id, when in sorted(self.latest.items())), encoding="utf-8"
+        )
+        temp.replace(self.path)
+        self.lines = len(self.latest)
+
+
+@dataclass
+class CheckRecord:
+    checked: float
+    remote: str
+    local: str
+
+
+class CheckState:
+    """
+    When each reference was last checked, and the remote and local digests seen then, keyed by image id.
+
+    The image id is the key because it is what a pull replaces: an updated image comes back under a new id
+    with no record, so its first run after the pull confirms it against the registry. With `--incremental` only
+    the references due are checked: moving tags (`latest`, `main`) hourly, floating ones (`3.12`, `bookworm`)
+    daily, pinned semver weekly.
+    """
+
+    def __init__(self, path: Path, entries: dict[str, dict[str, CheckRecord]]) -> None:
+        self.path = path
+        self.entries = entries
+        self.started = time.time()
+
+    @classmethod
+    def load(cls, path: Path) -> CheckState:
+        try:
+            raw: dict[str, dict[str, dict[str, Any]]] = json.loads(path.read_text(encoding="utf-8"))
+            entries = {
+                image_id: {image: CheckRecord(**record) for image, record in references.items()}
+                for image_id, references in raw.items()
+            }
+        except OSError, ValueError, TypeError:
+            # A missing or corrupt state file only costs one full sweep.
+            entries = {}
+        return cls(path, entries)
+
+    def select(self, images: list[ImageStatus], overrides: list[tuple[str, timedelta]]) -> list[ImageStatus]:
+        """Return the images due a check; the rest are marked deferred."""
+        now = self.started = time.time()
+        due: list[ImageStatus] = []
+        for status in images:
+            record = self.entries.get(status.image_id, {}).get(status.image)
+            # A local digest that moved since was pulled or rebuilt by hand, so the record no longer describes it.
+            if record is None or record.local != status.local:
+                due.append(status)
+                continue
+            interval = check_interval(status.image, overrides)
+            if (wait_for := next_check(status, record, interval) - now) <= interval.total_seconds() * _CHECK_SLACK:
+                due.append(status)
+                continue
+            status.state, status.reason, status.remote = "deferred", "not due", record.remote
+            status.detail = f"next check in {format_duration(wait_for)}"
+        return due
+
+    def record(self, images: list[ImageStatus]) -> None:
+        # Only a completed check is remembered; unreachable and failed images are retried on the next run. It is
+        # stamped with the run's start, not its end, so a long run does not push the next check past a cron tick.
+        for status in images:
+            if status.state == "up to date":
+                self.entries.setdefault(status.image_id, {})[status.image] = CheckRecord(
+                    self.started, status.remote, status.local
+                )
+
+    def save(self) -> None:
+        cutoff = time.time() - _CHECK_STATE_RETENTION.total_seconds()
+        data = {
+            image_id: kept
+            for image_id, references in sorted(self.entries.items())
+            if (kept := {image: asdict(record) for image, record in references.items() if record.checked > cutoff})
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        temp.replace(self.path)
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    host: str
+    repository: str
+    reference: str
+
+    @classmethod
+    def parse(cls, image: str) -> ImageRef:
+        name, _, digest = image.partition("@")
+        # A ":" after the last "/" is a tag; one before it belongs to a host:port.
+        repo, colon, tag = name.rpartition(":") if ":" in name.rsplit("/", 1)[-1] else (name, "", "")
+        host, _, path = repo.partition("/")
+        if host in {"docker.io", "index.docker.io"}:
+            host = _DOCKER_HUB
+            path = path if "/" in path else f"library/{path}"
+        return cls(host, path, digest or (tag if colon else "latest"))
+
+    @property
+    def base_url(self) -> str:
+        # Docker itself only allows plain HTTP towards loopback registries without extra daemon config.
+        insecure = self.host.startswith(("localhost", "127.0.0.1"))
+        return f"{'http' if insecure else 'https'}://{self.host}"
+
+
+@dataclass
+class ManifestHead:
+    digest: str
+    etag: str
+    not_modified: bool = False
+
+
+class RegistryError(Exception):
+    pass
+
+
+class DockerCredentials:
+    """Registry credentials from ~/.docker/config.json; credential helpers run at most once per registry."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.auths: dict[str, str] = {
+            registry_key(key): entry["auth"] for key, entry in config.get("auths", {}).items() if entry.get("auth")
+        }
+        # `az acr login` and friends store an OAuth refresh token instead of a password.
+        self.identity_tokens: dict[str, str] = {
+            registry_key(key): entry["identitytoken"]
+            for key, entry in config.get("auths", {}).items()
+            if entry.get("identitytoken")
+        }
+        self.helpers: dict[str, str] = {registry_key(key): name for key, name in config.get("credHelpers", {}).items()}
+        self.store: str = config.get("credsStore", "")
+        self.resolved: dict[str, tuple[str, str] | None] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls) -> DockerCredentials:
+        config_dir = Path(os.environ.get("DOCKER_CONFIG") or Path.home() / ".docker")
+        try:
+            return cls(json.loads((config_dir / "config.json").read_text(encoding="utf-8")))
+        except OSError, ValueError:
+            return cls({})
+
+    def get(self, host: str) -> tuple[str, str] | None:
+        """Username and password; an identity token needs an OAuth exchange, so registry checks leave it to crane."""
+        credentials = self.entry(host)
+        return None if credentials is None or credentials[0] == _IDENTITY_TOKEN else credentials
+
+    def entry(self, host: str) -> tuple[str, str] | None:
+        """Username and secret as stored; the username is `_IDENTITY_TOKEN` when the secret is an identity token."""
+        key = registry_key(host)
+        with self.lock:
+            if key not in self.resolved:
+                self.resolved[key] = self.lookup(key)
+            return self.resolved[key]
+
+    def lookup(self, key: str) -> tuple[str, str] | None:
+        if token := self.identity_tokens.get(key):
+            return _IDENTITY_TOKEN, token
+        if auth := self.auths.get(key):
+            try:
+                user, _, password = base64.b64decode(auth).decode().partition(":")
+            except ValueError:  # binascii.Error and UnicodeDecodeError alike: a hand-edited entry, not a login
+                return None
+            return user, password
+        return self.from_helper(key)
+
+    def from_helper(self, key: str) -> tuple[str, str] | None:
+        if not (helper := self.helpers.get(key, self.store)):
+            return None
+        server = _DOCKER_HUB_AUTH_KEY if key == "index.docker.io" else key
+        try:
+            result = subprocess.run(
+                [f"docker-credential-{helper}", "get"], input=server, check=False, capture_output=True, text=True
+            )
+            data = json.loads(result.stdout) if result.returncode == 0 else {}
+        except OSError, ValueError:
+            return None
+        if not data.get("Secret"):
+            return None
+        return data.get("Username", ""), data["Secret"]
+
+
+def platform_entry(manifest: dict[str, Any], image_platform: str) -> dict[str, Any] | None:
+    """The index entry for `image_platform` ("os/arch[/variant]"), or None when `manifest` is not an index."""
+    if "manifests" not in manifest:
+        return None
+    os_name, _, arch = image_platform.partition("/")
+    arch, _, variant = arch.partition("/")
+    candidates: list[dict[str, Any]] = [
+        entry
+        for entry in manifest["manifests"]
+        if entry.get("platform", {}).get("os") == os_name and entry.get("platform", {}).get("architecture") == arch
+    ]
+    exact = [entry for entry in candidates if not variant or entry["platform"].get("variant") == variant]
+    if not (chosen := exact or candidates):
+        msg = f"no {image_platform} entry in index"
+        raise ValueError(msg)
+    return chosen[0]
+
+
+def read_chunks(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        while chunk := handle.read(1 << 20):
+            yield chunk
+
+
+def registry_key(server: str) -> str:
+    host = server.removeprefix("https://").removeprefix("http://").split("/", 1)[0]
+    return "index.docker.io" if host in {"docker.io", _DOCKER_HUB} else host
+
+
+class RegistryClient:
+    """
+    Registry v2 client resolving manifest digests with HEAD requests.
+
+    One pooled keep-alive HTTP client serves every registry, and bearer tokens are cached per registry and
+    scope, so checking many images on one registry costs one token fetch and one HEAD per image.
+    """
+
+    def __init__(self, credentials: DockerCredentials, limits: RegistryLimits) -> None:
+        self.credentials = credentials
+        self.limits = limits
+        self.http = httpx.Client(timeout=30, limits=httpx.Limits(max_connections=32, max_keepalive_connections=32))
+        self.tokens: dict[tuple[str, str], tuple[str, float]] = {}
+        self.manifests: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self.manifest_locks: dict[tuple[str, str, str], threading.Lock] = {}
+        self.plain_http: set[str] = set()
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.http.close()
+
+    def head_manifest(self, image: str, etag: str = "") -> ManifestHead:
+        ref = ImageRef.parse(image)
+        headers = {"Accept": _MANIFEST_TYPES}
+        if etag:
+            headers["If-None-Match"] = etag
+        response = self.request("HEAD", ref, f"/v2/{ref.repository}/manifests/{ref.reference}", headers)
+        if response.status_code == 304:
+            return ManifestHead("", etag, not_modified=True)
+        if response.status_code != 200 or not (digest := response.headers.get("Docker-Content-Digest", "")):
+            msg = f"HEAD manifest {image}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+        return ManifestHead(digest, response.headers.get("ETag", ""))
+
+    def get_manifest(self, ref: ImageRef) -> dict[str, Any]:
+        if not ref.reference.startswith("sha256:"):
+            return self.fetch_manifest(ref)
+        # A manifest fetched by digest never changes, so fleet members planning the same update share one GET.
+        key = (ref.host, ref.repository, ref.reference)
+        with self.lock:
+            key_lock = self.manifest_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if (manifest := self.manifests.get(key)) is None:
+                manifest = self.manifests[key] = self.stored_manifest(ref)
+        return manifest
+
+    def stored_manifest(self, ref: ImageRef) -> dict[str, Any]:
+        # Docker Hub bills every manifest GET as a pull, and planning reads the new manifest and those of the
+        # digests it replaces. Bodies addressed by digest never change, so each is fetched once, ever: the new
+        # manifest of this run is the old one of the next.
+        path = _CACHE_DIR / "manifests" / ref.reference.replace(":", "-")
+        try:
+            return cast("dict[str, Any]", json.loads(path.read_bytes()))
+        except OSError, ValueError:
+            pass
+        raw, _media_type = self.manifest_bytes(ref)
+        if f"sha256:{hashlib.sha256(raw).hexdigest()}" == ref.reference:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as handle:
+                    handle.write(raw)
+                Path(handle.name).replace(path)
+            except OSError:
+                pass
+        return cast("dict[str, Any]", json.loads(raw))
+
+    def fetch_manifest(self, ref: ImageRef) -> dict[str, Any]:
+        response = self.request(
+            "GET", ref, f"/v2/{ref.repository}/manifests/{ref.reference}", {"Accept": _MANIFEST_TYPES}
+        )
+        if response.status_code != 200:
+            msg = f"GET manifest {ref.repository}@{ref.reference}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+        return cast("dict[str, Any]", response.json())
+
+    def manifest_bytes(self, ref: ImageRef) -> tuple[bytes, str]:
+        """The manifest exactly as served, with its media type; copies must keep the bytes to keep the digest."""
+        response = self.request(
+            "GET", ref, f"/v2/{ref.repository}/manifests/{ref.reference}", {"Accept": _MANIFEST_TYPES}
+        )
+        if response.status_code != 200:
+            msg = f"GET manifest {ref.repository}@{ref.reference}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+        media_type = response.headers.get("Content-Type") or json.loads(response.content).get("mediaType", "")
+        return response.content, media_type
+
+    def put_manifest(self, ref: ImageRef, reference: str, raw: bytes, media_type: str) -> None:
+        path = f"/v2/{ref.repository}/manifests/{reference}"
+        response = self.request("PUT", ref, path, {"Content-Type": media_type}, content=raw, actions="pull,push")
+        if response.status_code not in {200, 201}:
+            msg = f"PUT manifest {ref.repository}:{reference}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+
+    def blob_exists(self, ref: ImageRef, digest: str) -> bool:
+        path = f"/v2/{ref.repository}/blobs/{digest}"
+        return self.request("HEAD", ref, path, {}, actions="pull,push").status_code == 200
+
+    def download_blob(self, ref: ImageRef, digest: str, partial: Path) -> None:
+        """Fetch a blob into `partial`, continuing from its current length with a ranged request."""
+        path = f"/v2/{ref.repository}/blobs/{digest}"
+        # The HEAD settles authentication; the body is then streamed outside `request` to follow CDN redirects.
+        self.request("HEAD", ref, path, {})
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = self.auth_headers(ref.host, f"repository:{ref.repository}:pull")
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        self.limits.bucket(ref.host).acquire()
+        try:
+            url = f"{self.base_url(ref)}{path}"
+            timeout = httpx.Timeout(30, read=300)
+            with self.http.stream("GET", url, headers=headers, follow_redirects=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    return
+                if response.status_code not in {200, 206}:
+                    msg = f"GET blob {short_digest(digest)}: HTTP {response.status_code}"
+                    raise RegistryError(msg)
+                # A 200 to a ranged request means the server ignored the range and is sending it all.
+                with partial.open("ab" if response.status_code == 206 else "wb") as handle:
+                    for chunk in response.iter_bytes(1 << 20):
+                        handle.write(chunk)
+        except httpx.HTTPError as exc:
+            raise RegistryError(str(exc)) from exc
+
+    def upload_blob(self, ref: ImageRef, digest: str, spool: Callable[[], Path], mounted_from: str) -> None:
+        # A cross-repository mount costs no bytes; when the mirror declines it, it answers with a plain upload.
+        query = f"?mount={digest}&from={mounted_from}" if mounted_from else ""
+        response = self.request("POST", ref, f"/v2/{ref.repository}/blobs/uploads/{query}", {}, actions="pull,push")
+        if response.status_code == 201:
+            return
+        if response.status_code != 202:
+            msg = f"start upload {short_digest(digest)}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+        location = urljoin(f"{self.base_url(ref)}/", response.headers["Location"])
+        spooled = spool()
+        headers = self.auth_headers(ref.host, f"repository:{ref.repository}:pull,push")
+        headers |= {"Content-Type": "application/octet-stream", "Content-Length": str(spooled.stat().st_size)}
+        self.limits.bucket(ref.host).acquire()
+        try:
+            response = self.http.put(
+                location,
+                params={"digest": digest},
+                headers=headers,
+                content=read_chunks(spooled),
+                timeout=httpx.Timeout(30, write=300),
+            )
+        except httpx.HTTPError as exc:
+            raise RegistryError(str(exc)) from exc
+        if response.status_code != 201:
+            msg = f"upload {short_digest(digest)}: HTTP {response.status_code}"
+            raise RegistryError(msg)
+
+    def auth_headers(self, host: str, scope: str) -> dict[str, str]:
+        if (token := self.cached_token(host, scope)) is not None:
+            return {"Authorization": f"Bearer {token}"}
+        if (credentials := self.credentials.get(host)) is not None:
+            return {"Authorization": f"Basic {base64.b64encode(':'.join(credentials).encode()).decode()}"}
+        return {}
+
+    def base_url(self, ref: ImageRef) -> str:
+        return f"http://{ref.host}" if ref.host in self.plain_http else ref.base_url
+
+    def platform_manifest(self, ref: ImageRef, image_platform: str) -> tuple[str, dict[str, Any]] | None:
+        """Digest and body of the manifest for `image_platform`, resolved through an index; None when unreadable."""
+        try:
+            manifest = self.get_manifest(ref)
+            if (entry := platform_entry(manifest, image_platform)) is None:
+                return ref.reference, manifest
+            return entry["digest"], self.get_manifest(dataclasses.replace(ref, reference=entry["digest"]))
+        except RegistryError, ValueError:
+            return None
+
+    def layer_sizes(self, ref: ImageRef, image_platform: str) -> dict[str, int] | None:
+        """Compressed size of each layer of the manifest for `image_platform`; None when it can't be read."""
+        if (resolved := self.platform_manifest(ref, image_platform)) is None:
+            return None
+        return {layer["digest"]: int(layer.get("size", 0)) for layer in resolved[1].get("layers", [])}
+
+    def request(  # noqa: PLR0913
+        self,
+        method: str,
+        ref: ImageRef,
+        path: str,
+        headers: dict[str, str],
+        *,
+        content: bytes | None = None,
+        actions: str = "pull",
+    ) -> httpx.Response:
+        scope = f"repository:{ref.repository}:{actions}"
+        bucket = self.limits.bucket(ref.host)
+        url = f"{self.base_url(ref)}{path}"
+        try:
+            for attempt in range(_MAX_RETRIES + 1):
+                if (token := self.cached_token(ref.host, scope)) is not None:
+                    headers = {**headers, "Authorization": f"Bearer {token}"}
+                bucket.acquire()
+                response = self.http.request(method, url, headers=headers, content=content)
+                if response.status_code == 401 and (auth := self.authorize(ref.host, scope, response)):
+                    bucket.acquire()
+                    response = self.http.request(method, url, headers={**headers, **auth}, content=content)
+                self.limits.observe(ref.host, response)
+                if response.status_code != 429 or attempt == _MAX_RETRIES:
+                    break
+                # Pause the whole host, not just this request: its siblings would hit the same 429.
+                bucket.pause(backoff_delay(attempt, response.headers.get("Retry-After", "")))
+        except httpx.HTTPError as exc:
+            raise RegistryError(str(exc)) from exc
+        return response
+
+    def cached_token(self, host: str, scope: str) -> str | None:
+        with self.lock:
+            token, expires = self.tokens.get((host, scope), ("", 0.0))
+        return token if token and time.monotonic() < expires else None
+
+    def authorize(self, host: str, scope: str, challenge: httpx.Response) -> dict[str, str] | None:
+        scheme, _, params = challenge.headers.get("WWW-Authenticate", "").partition(" ")
+        fields = dict(re.findall(r'(\w+)="([^"]*)"', params))
+        credentials = self.credentials.get(host)
+        if scheme.lower() == "basic":
+            if credentials is None:
+                return None
+            return {"Authorization": f"Basic {base64.b64encode(':'.join(credentials).encode()).decode()}"}
+        if scheme.lower() != "bearer" or "realm" not in fields:
+            return None
+        query = {"service": fields.get("service", host), "scope": fields.get("scope", scope)}
+        response = self.http.get(fields["realm"], params=query, auth=credentials)
+        if response.status_code != 200:
+            return None
+        # A proxy or captive portal can answer the realm with HTML; without a token the 401 stands.
+        try:
+            data = response.json()
+            token = data.get("token") or data.get("access_token")
+            lifetime = float(data.get("expires_in", 60))
+        except ValueError, TypeError, AttributeError:
+            token, lifetime = None, 0.0
+        if not token:
+            return None
+        # Registries default to a 60s lifetime; renew a little early so an in-flight request never expires.
+        expires = time.monotonic() + max(lifetime - 10, 10)
+        with self.lock:
+            self.tokens[host, scope] = (token, expires)
+        return {"Authorization": f"Bearer {token}"}
+
+
+class TokenBucket:
+    """Paces requests to one registry host: `rate` per second, bursting up to one second's worth."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class RegistryLimits:
+    """
+    Per-host concurrency caps and request buckets, plus the last rate-limit quota each host reported.
+
+    Work is scheduled per registry host against these; a 429 (or a pull hitting "toomanyrequests") backs off
+    exponentially instead of surfacing as unreachable.
+    """
+
+    def __init__(self, overrides: dict[str, HostLimit]) -> None:
+        self.overrides = overrides
+        self.buckets: dict[str, TokenBucket] = {}
+        self.remaining: dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def for_host(self, host: str) -> HostLimit:
+        return self.overrides.get(host, _DEFAULT_LIMIT)
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if (bucket := self.buckets.get(host)) is None:
+                bucket = self.buckets[host] = TokenBucket(self.for_host(host).rate)
+            return bucket
+
+    def observe(self, host: str, response: httpx.Response) -> None:
+        # Docker Hub reports its pull quota as "RateLimit-Remaining: 76;w=21600" (pulls left in the window).
+        # Manifest HEADs don't spend it, so it only informs the user; pulls back off on their own 429s.
+        if remaining := response.headers.get("RateLimit-Remaining"):
+            with self.lock:
+                self.remaining[host] = remaining.split(";", 1)[0]
+
+
+def report_rate_limits(limits: RegistryLimits) -> None:
+    for host, remaining in sorted(limits.remaining.items()):
+        _CONSOLE.print(f"[bright_black]{host}: {remaining} pulls left in the current rate-limit window[/]")
+
+
+def connect_daemon(credentials: DockerCredentials, *, force_cli: bool, target: str = "") -> Daemon:
+    """The Engine API over a local socket where one is reachable, else the `docker` CLI, which knows TLS and SSH."""
+    if not target:
+        if not force_cli and (socket := engine_socket()) is not None:
+            return DockerEngine(socket, credentials)
+        return DockerCli()
+    if target.startswith("unix://") and not force_cli and (socket := Path(target.removeprefix("unix://"))).is_socket():
+        return DockerEngine(socket, credentials)
+    return DockerCli({"DOCKER_HOST": target} if "://" in target else {"DOCKER_CONTEXT": target})
+
+
+def engine_socket() -> Path | None:
+    # Only a local socket is spoken natively; tcp/ssh hosts and named contexts carry TLS or SSH
+    # settings that the CLI already knows how to honour.
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host and not docker_host.startswith("unix://"):
+        return None
+    if os.environ.get("DOCKER_CONTEXT", "default") != "default" or current_context() != "default":
+        return None
+    candidates = (
+        [Path(docker_host.removeprefix("unix://"))]
+        if docker_host
+        else [Path("/var/run/docker.sock"), Path.home() / ".docker" / "run" / "docker.sock"]
     )
-    summary: str = next((line.strip() for line in result.stdout.splitlines() if "reclaimed" in line.lower()), "")
-    _CONSOLE.print(f"[bright_black]{summary or 'Pruned dangling docker data.'}[/]")
+    return next((candidate for candidate in candidates if candidate.is_socket()), None)
+
+
+def current_context() -> str:
+    config_dir = Path(os.environ.get("DOCKER_CONFIG") or Path.home() / ".docker")
+    try:
+        return json.loads((config_dir / "config.json").read_text(encoding="utf-8")).get("currentContext") or "default"
+    except OSError, ValueError:
+        return "default"
+
+
+class Daemon(Protocol):
+    def __enter__(self) -> Self: ...
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None: ...
+
+    def list_images(self) -> list[tuple[str, str, str, str]]:
+        """(repo:tag, image id, digest for that repo, display size) per tagged image."""
+        ...
+
+    def inspect_images(self, image_ids: list[str]) -> dict[str, tuple[set[str], datetime | None, str]]: ...
+
+    def last_run_times(self) -> dict[str, datetime]: ...
+
+    def remove_images(self, images: list[str]) -> dict[str, str]:
+        """Outcome per reference: "" once removed, `_IN_USE` if a container uses it, else the daemon's error."""
+        ...
+
+    def disk_usage(self) -> list[DiskImage]: ...
+
+    def free_space(self) -> int | None: ...
+
+    def prune(self) -> tuple[str, list[str]]:
+        """The reclaimed-space summary, and an error per part of the prune that failed."""
+        ...
+
+    def pull(self, image: str) -> tuple[bool, str, dict[str, int]]:
+        """Success, error, and the bytes fetched per layer (layers already local are absent)."""
+        ...
+
+    def watch_starts(self) -> Iterator[tuple[str, float]]:
+        """(image id, epoch seconds) for each container start, as the daemon reports them."""
+        ...
+
+
+class DockerCli:
+    """Daemon access through the `docker` CLI, one process per operation."""
+
+    def __init__(self, target: dict[str, str] | None = None) -> None:
+        # DOCKER_HOST outranks DOCKER_CONTEXT, so an inherited one must not redirect a fleet member.
+        self.env: dict[str, str] | None = None
+        if target is not None:
+            self.env = {k: v for k, v in os.environ.items() if k not in {"DOCKER_HOST", "DOCKER_CONTEXT"}} | target
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        pass
+
+    def list_images(self) -> list[tuple[str, str, str, str]]:
+        listing: subprocess.CompletedProcess[str] = subprocess.run(
+            [
+                "docker",
+                "images",
+                "--digests",
+                "--no-trunc",
+                "--format",
+                "{{.Repository}}:{{.Tag}}\t{{.ID}}\t{{.Digest}}\t{{.Size}}",
+            ],
+            check=False,
+            env=self.env,
+            capture_output=True,
+            text=True,
+        )
+        return [
+            (parts[0], parts[1], parts[2], parts[3])
+            for raw_line in listing.stdout.splitlines()
+            if len(parts := raw_line.split("\t")) == 4 and "<none>" not in parts[0]
+        ]
+
+    def inspect_images(self, image_ids: list[str]) -> dict[str, tuple[set[str], datetime | None, str]]:
+        if not image_ids:
+            return {}
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            [
+                "docker",
+                "image",
+                "inspect",
+                "--format",
+                "{{.Id}}\t{{json .RepoDigests}}\t{{.Created}}\t{{.Os}}/{{.Architecture}}",
+                *sorted(set(image_ids)),
+            ],
+            check=False,
+            env=self.env,
+            capture_output=True,
+            text=True,
+        )
+        inspected: dict[str, tuple[set[str], datetime | None, str]] = {}
+        for line in result.stdout.splitlines():
+            image_id, _, rest = line.partition("\t")
+            digests_json, _, rest = rest.partition("\t")
+            created, _, image_platform = rest.partition("\t")
+            # {{json .RepoDigests}} emits "null" for a nil slice, which json.loads -> None; coerce to empty.
+            digests = json.loads(digests_json) if digests_json.strip() else []
+            inspected[image_id] = (set(digests or []), parse_created(created), image_platform)
+        return inspected
+
+    def last_run_times(self) -> dict[str, datetime]:
+        # The only signal for when an image was last run is a container's State.StartedAt; with ephemeral
+        # (--rm) containers none survive, so scan_images falls back to the image build time.
+        container_ids: list[str] = subprocess.run(
+            ["docker", "ps", "-a", "--no-trunc", "--format", "{{.ID}}"],
+            check=False,
+            env=self.env,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        if not container_ids:
+            return {}
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            ["docker", "container", "inspect", "--format", "{{.Image}}\t{{.State.StartedAt}}", *container_ids],
+            check=False,
+            env=self.env,
+            capture_output=True,
+            text=True,
+        )
+        runs: dict[str, datetime] = {}
+        for line in result.stdout.splitlines():
+            image_id, _, started = line.partition("\t")
+            # Docker's zero time marks a container that was created but never started
+            if started.startswith("0001"):
+                continue
+            if (when := parse_created(started)) and when > runs.get(image_id, _OLDEST):
+                runs[image_id] = when
+        return runs
+
+    def remove_images(self, images: list[str]) -> dict[str, str]:
+        # One invocation for the whole batch; removal continues past failures, so read back what went.
+        if not images:
+            return {}
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            ["docker", "rmi", *images], check=False, capture_output=True, text=True, env=self.env
+        )
+        gone = {line.partition(": ")[2].strip() for line in result.stdout.splitlines()}
+        errors = [line.removeprefix("Error response from daemon: ") for line in result.stderr.splitlines()]
+        outcomes: dict[str, str] = {}
+        for image in images:
+            # Untagged lines echo the reference; an image removed by (short) id only shows as "Deleted: sha256:…".
+            if image in gone or any(entry.startswith(f"sha256:{image.removeprefix('sha256:')}") for entry in gone):
+                outcomes[image] = ""
+                continue
+            outcomes[image] = removal_error(next((line for line in errors if names_image(line, image)), "not removed"))
+        return outcomes
+
+    def disk_usage(self) -> list[DiskImage]:
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            ["docker", "system", "df", "-v", "--format", "json"],
+            check=False,
+            capture_output=True,
+            text=True,
+            env=self.env,
+        )
+        try:
+            entries = json.loads(result.stdout).get("Images") or []
+        except ValueError:
+            return []
+        by_id: dict[str, DiskImage] = {}
+        for entry in entries:
+            # The CLI prints short ids and human sizes ("72.8MB").
+            image_id = entry.get("ID", "")
+            image = by_id.setdefault(
+                image_id,
+                DiskImage(
+                    image_id=image_id,
+                    references=[],
+                    size=parse_size(entry.get("Size", "")),
+                    unique=parse_size(entry.get("UniqueSize", "")),
+                    containers=int(entry.get("Containers") or 0),
+                    created=parse_created(entry.get("CreatedAt", "")[:25].replace(" ", "T", 1)),
+                ),
+            )
+            if "<none>" not in (reference := f"{entry.get('Repository')}:{entry.get('Tag')}"):
+                image.references.append(reference)
+        return [
+            image if image.references else dataclasses.replace(image, references=[image_id])
+            for image_id, image in by_id.items()
+        ]
+
+    def free_space(self) -> int | None:
+        # Only a daemon on this machine has its data root on a filesystem we can measure; a remote one's root
+        # path may well exist here too, on the wrong disk. That holds for an inherited DOCKER_HOST as well.
+        env = os.environ if self.env is None else self.env
+        if docker_host := env.get("DOCKER_HOST", ""):
+            if not docker_host.startswith("unix://"):
+                return None
+        elif (env.get("DOCKER_CONTEXT") or current_context()) != "default":
+            return None
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            ["docker", "info", "--format", "{{.DockerRootDir}}"],
+            check=False,
+            capture_output=True,
+            text=True,
+            env=self.env,
+        )
+        return data_root_free(result.stdout.strip())
+
+    def prune(self) -> tuple[str, list[str]]:
+        result: subprocess.CompletedProcess[str] = subprocess.run(
+            ["docker", "system", "prune", "-f", "--volumes"], check=False, capture_output=True, text=True, env=self.env
+        )
+        summary = next((line.strip() for line in result.stdout.splitlines() if "reclaimed" in line.lower()), "")
+        if result.returncode:
+            return summary, [short_error(result.stderr, 120) or f"exit status {result.returncode}"]
+        return summary, []
+
+    def pull(self, image: str) -> tuple[bool, str, dict[str, int]]:
+        # A pty makes docker emit per-layer progress ("Downloading [..] done/total"); summing each
+        # layer's total yields the bytes actually fetched, which the non-tty capture_output never prints.
+        layer_totals: dict[str, int] = {}
+        output: list[str] = []
+        pid, fd = pty.fork()
+        if pid == 0:
+            try:
+                os.execvpe("docker", ["docker", "pull", image], self.env or os.environ)
+            except OSError:
+                os._exit(127)
+        try:
+            while True:
+                try:
+                    data = os.read(fd, 65536)
+                except OSError:
+                    break
+                if not data:
+                    break
+                text = data.decode("utf-8", "replace")
+                output.append(text)
+                for layer, total in _DOWNLOAD_RE.findall(text):
+                    layer_totals[layer] = parse_size(total)
+        finally:
+            os.close(fd)
+        if os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) == 0:
+            return True, "", layer_totals
+        text = "".join(output)
+        if "toomanyrequests" in text or "429 Too Many Requests" in text:
+            return False, _RATE_LIMITED, {}
+        return False, short_error(text), {}
+
+    def watch_starts(self) -> Iterator[tuple[str, float]]:
+        filters = [f"{key}={value}" for key, values in _START_FILTERS.items() for value in values]
+        events = subprocess.Popen(
+            ["docker", "events", *(f"--filter={spec}" for spec in filters), "--format", "{{json .}}"],
+            stdout=subprocess.PIPE,
+            text=True,
+            env=self.env,
+        )
+        assert events.stdout is not None
+        try:
+            yield from container_starts(map(json.loads, events.stdout), self.image_id)
+        finally:
+            events.terminate()
+            events.wait()
+
+    def image_id(self, image: str) -> str:
+        return subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+            check=False,
+            capture_output=True,
+            text=True,
+            env=self.env,
+        ).stdout.strip()
+
+
+def container_starts(events: Iterable[dict[str, Any]], image_id: Callable[[str], str]) -> Iterator[tuple[str, float]]:
+    # A container run with --rm may be gone by the time its start event is read, so the image comes from the
+    # event itself and is resolved to its id by an image inspect, memoized until an image event (a pull or
+    # retag may point the name at another id) clears it.
+    resolved: dict[str, str] = {}
+    for event in events:
+        if event.get("Type") == "image":
+            resolved.clear()
+            continue
+        if not (image := event.get("Actor", {}).get("Attributes", {}).get("image") or event.get("from", "")):
+            continue
+        if image not in resolved:
+            resolved[image] = image_id(image)
+        if resolved[image]:
+            yield resolved[image], float(event["time"])
+
+
+def removal_error(message: str) -> str:
+    # Docker words every 409 "conflict: unable to ... - <why>", for a container using the image and for dependent
+    # child images alike; only the first is expected, the second is reported with the daemon's own reason.
+    if message.startswith("conflict"):
+        why = message.rpartition(" - ")[2]
+        return _IN_USE if "container" in why else short_error(why)
+    return short_error(message)
+
+
+def engine_error(response: httpx.Response) -> str:
+    # Error bodies are usually {"message": ...}, but a proxy in between may answer with anything.
+    try:
+        message = response.json().get("message", "")
+    except ValueError, AttributeError:
+        message = ""
+    return message or f"HTTP {response.status_code}"
+
+
+def names_image(line: str, image: str) -> bool:
+    # Whole references only, so the error about "foo-bar:1" is not pinned on "foo"; an id may be cut to 12 digits.
+    bare = image.removeprefix("sha256:")
+    is_id = re.fullmatch(r"[0-9a-f]{12,64}", bare) is not None
+    for raw in re.findall(r"[\w.:/@-]+", line):
+        token = raw.rstrip(".:").removeprefix("sha256:")
+        if token == bare or (is_id and len(token) >= 12 and bare.startswith(token)):
+            return True
+    return False
+
+
+def data_root_free(root: str) -> int | None:
+    # Under Docker Desktop or a remote host the reported root is inside a VM and absent here.
+    if not root or not Path(root).exists():
+        return None
+    return shutil.disk_usage(root).free
+
+
+class DockerEngine:
+    """
+    Daemon access over the Engine API socket: listings are one JSON request each, and pulls stream
+    per-layer progress events carrying exact byte counts instead of terminal text to scrape.
+    """
+
+    def __init__(self, socket: Path, credentials: DockerCredentials) -> None:
+        self.credentials = credentials
+        self.http = httpx.Client(
+            transport=httpx.HTTPTransport(uds=str(socket)), base_url="http://docker", timeout=httpx.Timeout(60)
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.http.close()
+
+    def get(self, path: str, **params: str) -> Any:  # noqa: ANN401
+        """The decoded response, or None when the object is gone (removed since it was listed)."""
+        response = self.http.get(path, params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def list_images(self) -> list[tuple[str, str, str, str]]:
+        rows: list[tuple[str, str, str, str]] = []
+        for image in self.get("/images/json"):
+            for tag in image.get("RepoTags") or []:
+                if "<none>" in tag:
+                    continue
+                repo = tag.rsplit(":", 1)[0]
+                digests = digests_for_repo(repo, set(image.get("RepoDigests") or []))
+                rows.append((tag, image["Id"], min(digests, default=""), format_bytes(image.get("Size", 0))))
+        return rows
+
+    def inspect_images(self, image_ids: list[str]) -> dict[str, tuple[set[str], datetime | None, str]]:
+        def inspect(image_id: str) -> tuple[str, tuple[set[str], datetime | None, str]] | None:
+            if (data := self.get(f"/images/{image_id}/json")) is None:
+                return None
+            return data["Id"], (
+                set(data.get("RepoDigests") or []),
+                parse_created(data.get("Created", "")),
+                f"{data.get('Os', '')}/{data.get('Architecture', '')}",
+            )
+
+        # Inspection has no bulk endpoint, but requests over the socket are cheap and run side by side.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return dict(entry for entry in executor.map(inspect, sorted(set(image_ids))) if entry is not None)
+
+    def last_run_times(self) -> dict[str, datetime]:
+        def started_at(container_id: str) -> tuple[str, str]:
+            data = self.get(f"/containers/{container_id}/json") or {}
+            return data.get("Image", ""), data.get("State", {}).get("StartedAt", "")
+
+        container_ids = [container["Id"] for container in self.get("/containers/json", all="1")]
+        runs: dict[str, datetime] = {}
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for image_id, started in executor.map(started_at, container_ids):
+                # Docker's zero time marks a container that was created but never started
+                if started.startswith("0001"):
+                    continue
+                if (when := parse_created(started)) and when > runs.get(image_id, _OLDEST):
+                    runs[image_id] = when
+        return runs
+
+    def remove_images(self, images: list[str]) -> dict[str, str]:
+        def remove(image: str) -> str:
+            try:
+                response = self.http.delete(f"/images/{quote(image, safe='')}")
+            except httpx.HTTPError as exc:
+                return short_error(str(exc))
+            if response.status_code == 200:
+                return ""
+            return removal_error(engine_error(response))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return dict(zip(images, executor.map(remove, images), strict=True))
+
+    def disk_usage(self) -> list[DiskImage]:
+        usage: list[DiskImage] = []
+        for entry in self.get("/system/df").get("Images") or []:
+            size = int(entry.get("Size") or 0)
+            # SharedSize is -1 when the daemon didn't compute it; then nothing is known to be shared.
+            shared = max(int(entry.get("SharedSize") or 0), 0)
+            tags = [tag for tag in entry.get("RepoTags") or [] if "<none>" not in tag]
+            usage.append(
+                DiskImage(
+                    image_id=entry["Id"],
+                    references=tags or [entry["Id"]],
+                    size=size,
+                    unique=size - shared,
+                    containers=max(int(entry.get("Containers") or 0), 0),
+                    created=datetime.fromtimestamp(entry["Created"], UTC) if entry.get("Created") else None,
+                )
+            )
+        return usage
+
+    def free_space(self) -> int | None:
+        return data_root_free(self.get("/info").get("DockerRootDir", ""))
+
+    def watch_starts(self) -> Iterator[tuple[str, float]]:
+        params = {"filters": json.dumps(_START_FILTERS)}
+        with self.http.stream("GET", "/events", params=params, timeout=None) as response:
+            events = (json.loads(line) for line in response.iter_lines() if line.strip())
+            yield from container_starts(events, self.image_id)
+
+    def image_id(self, image: str) -> str:
+        return (self.get(f"/images/{quote(image, safe='')}/json") or {}).get("Id", "")
+
+    def prune(self) -> tuple[str, list[str]]:
+        # The same set `docker system prune -f --volumes` covers; build cache pruning is absent on old daemons.
+        reclaimed = 0
+        errors: list[str] = []
+        for kind in ("containers", "networks", "images", "volumes", "build"):
+            try:
+                response = self.http.post(f"/{kind}/prune", timeout=None)
+            except httpx.HTTPError as exc:
+                errors.append(f"{kind}: {short_error(str(exc), 120)}")
+                continue
+            if response.status_code == 200:
+                reclaimed += int(response.json().get("SpaceReclaimed") or 0)
+            elif not (kind == "build" and response.status_code == 404):
+                errors.append(f"{kind}: {short_error(engine_error(response), 120)}")
+        return f"Total reclaimed space: {format_bytes(reclaimed)}", errors
+
+    def pull(self, image: str) -> tuple[bool, str, dict[str, int]]:
+        name, _, tag = image.rpartition(":") if ":" in image.rsplit("/", 1)[-1] else (image, "", "latest")
+        headers = {}
+        if (auth := self.registry_auth(image)) is not None:
+            headers["X-Registry-Auth"] = auth
+        layer_totals: dict[str, int] = {}
+        try:
+            with self.http.stream(
+                "POST", "/images/create", params={"fromImage": name, "tag": tag}, headers=headers, timeout=None
+            ) as response:
+                if response.status_code != 200:
+                    return False, short_error(response.read().decode("utf-8", "replace")), {}
+                for line in response.iter_lines():
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if error := event.get("error"):
+                        return False, _RATE_LIMITED if "toomanyrequests" in error else short_error(error), {}
+                    if event.get("status") == "Downloading" and (total := event.get("progressDetail", {}).get("total")):
+                        layer_totals[event["id"]] = int(total)
+        except httpx.HTTPError as exc:
+            return False, short_error(str(exc)), {}
+        return True, "", layer_totals
+
+    def registry_auth(self, image: str) -> str | None:
+        host = ImageRef.parse(image).host
+        if (credentials := self.credentials.entry(host)) is None:
+            return None
+        username, secret = credentials
+        server = _DOCKER_HUB_AUTH_KEY if (key := registry_key(host)) == "index.docker.io" else key
+        # The daemon runs the OAuth exchange for an identity token itself, as it does for `docker pull`.
+        payload = (
+            {"identitytoken": secret} if username == _IDENTITY_TOKEN else {"username": username, "password": secret}
+        )
+        return base64.urlsafe_b64encode(json.dumps(payload | {"serveraddress": server}).encode()).decode()
+
+
+@dataclass
+class MirrorJob:
+    source: ImageRef
+    target: ImageRef
+    tags: set[str] = field(default_factory=set)
+    platforms: set[str] = field(default_factory=set)
+    statuses: list[ImageStatus] = field(default_factory=list)
+    manifests: list[tuple[str, bytes, str]] = field(default_factory=list)
+    blobs: set[str] = field(default_factory=set)
+
+    __hash__ = object.__hash__
+
+
+@dataclass
+class PullPlan:
+    status: ImageStatus
+    remote: str
+    host: str
+    layers: dict[str, int] | None
+    present: dict[str, int]
+    checked: float = 0.0
+
+    def missing(self, present: set[str]) -> set[str]:
+        return set(self.layers or {}) - present
+
+    def expected(self, present: set[str]) -> int:
+        # Unknown layers (manifest unreadable) plan as zero bytes: they can't be ordered, so they never block.
+        sizes = self.layers or {}
+        return sum(sizes[layer] for layer in self.missing(present))
+
+
+@dataclass
+class DiskImage:
+    image_id: str
+    references: list[str]
+    size: int
+    unique: int
+    containers: int
+    created: datetime | None
+    last_used: datetime | None = None
 
 
 @dataclass
@@ -399,11 +2496,19 @@ class ImageStatus:
     local: str
     size: str
     created: datetime | None
+    image_id: str = ""
     platform: str = ""
     registry_digests: set[str] = field(default_factory=set)
     state: str = "checking"
     detail: str = ""
     duration: float | None = None
+    expected: int | None = None
+    daemon: str = ""
+    reason: str = ""
+    remote: str = ""
+    digest_time: float | None = None
+    pull_time: float | None = None
+    layers: dict[str, int] = field(default_factory=dict)
 
 
 if __name__ == "__main__":